@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""
+Decoder benchmark
+
+Compares rview.radolan.read_radolan (raw counts plus flag bitfield) with
+wradlib.io.read_RADOLAN_composite on a set of RADOLAN files.
+
+Usage: python radolan_decoder_benchmark.py /path/to/raa01-*
+"""
+
+import sys
+import timeit
+
+import wradlib as wrl
+
+from rview import radolan
+
+
+def bench(func, files, repeat=3):
+    def run():
+        for f in files:
+            func(f)
+    # best of repeat, per file
+    return min(timeit.repeat(run, number=1, repeat=repeat)) / len(files)
+
+
+if __name__ == '__main__':
+    files = sys.argv[1:]
+    if not files:
+        print(__doc__)
+        sys.exit(1)
+
+    t_wrl = bench(lambda f: wrl.io.read_RADOLAN_composite(f), files)
+    t_rv = bench(lambda f: radolan.read_radolan(f), files)
+    t_rvp = bench(lambda f: radolan.to_physical(*radolan.read_radolan(f)),
+                  files)
+
+    print("files: {0}".format(len(files)))
+    print("wradlib read_RADOLAN_composite:  {0:8.2f} ms".format(t_wrl * 1e3))
+    print("rview read_radolan (counts):     {0:8.2f} ms".format(t_rv * 1e3))
+    print("rview read_radolan + to_physical:{0:8.2f} ms".format(t_rvp * 1e3))
+    print("speedup (counts): {0:.1f}x".format(t_wrl / t_rv))
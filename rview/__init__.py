@@ -5,4 +5,12 @@
 # -----------------------------------------------------------------------------
 #!/usr/bin/env python
 
-from . import gui
+
+
+def __getattr__(name):
+    # the GUI needs PyQt, import it on first access only, so that
+    # headless tools like rview.render work without a display
+    if name == 'gui':
+        from . import gui
+        return gui
+    raise AttributeError("module 'rview' has no attribute {0!r}".format(name))
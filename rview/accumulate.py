@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Streaming temporal accumulation
+
+Running sum, maximum, count of valid frames and exceedance counts over a
+range of RADOLAN frames. Memory depends on the grid only, not on the
+length of the range. Ranges are split into chunks which are accumulated
+in a process pool and merged.
+
+Quantities are precipitation amounts per frame: 16 bit products are
+summed as counts and scaled with the precision at the end, RX/EX (RVP6
+units) are converted to amounts with Z = 200 R^1.6 first.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from rview import radolan, utils
+from rview.bulk import create_pool
+
+
+def rvp6_to_amount(interval=300, a=200., b=1.6):
+    """Lookup table of precipitation amount in mm per RVP6 count."""
+    dbz = np.arange(256) / 2. - 32.5
+    rate = (10 ** (dbz / 10.) / a) ** (1. / b)
+    amount = rate * interval / 3600.
+    # special values, nodata and clutter, do not add anything
+    amount[249:] = 0
+    return amount.astype(np.float32)
+
+
+def frame_quantity(values, flags, attrs):
+    """Return ``(quantity, valid, scale)`` of a decoded frame.
+
+    ``quantity * scale`` is the amount in physical units.
+    """
+    valid = ~(flags & (radolan.FLAG_NODATA | radolan.FLAG_CLUTTER)).astype(bool)
+    if attrs['producttype'] in radolan.BYTE_PRODUCTS:
+        lut = rvp6_to_amount(attrs.get('intervalseconds', 300))
+        return lut.take(values), valid, 1.
+    return values, valid, attrs.get('precision', 1.)
+
+
+def counts_quantity(counts, metadata):
+    """Return ``(quantity, valid, scale)`` like :func:`frame_quantity`
+    for integer counts as from :func:`rview.utils.read_radolan_counts`.
+
+    Nodata pixels hold ``metadata['nodata']``. Clutter is only known for
+    the 8 bit products, its flag is not kept in 16 bit counts.
+    """
+    nodata = metadata.get('nodata')
+    if nodata is None:
+        valid = np.ones(counts.shape, dtype=bool)
+    else:
+        valid = counts != nodata
+    if metadata['producttype'] in radolan.BYTE_PRODUCTS:
+        valid &= counts != 249
+        lut = rvp6_to_amount(metadata.get('intervalseconds', 300))
+        return lut.take(counts), valid, 1.
+    return counts, valid, metadata.get('precision', 1.)
+
+
+class Accumulator(object):
+    """
+    Running statistics over frames of one product.
+
+    ``thresholds`` are in physical units (e.g. mm per frame). Counts are
+    stored as uint16, so a range may hold up to 65535 frames.
+    """
+    def __init__(self, shape, thresholds=()):
+        self.shape = shape
+        self.thresholds = tuple(thresholds)
+        self.scale = None
+        self.frames = 0
+        self.sum = np.zeros(shape, dtype=np.float64)
+        self.max = np.zeros(shape, dtype=np.float32)
+        self.count = np.zeros(shape, dtype=np.uint16)
+        self.exceed = np.zeros((len(self.thresholds),) + tuple(shape),
+                               dtype=np.uint16)
+
+    def add(self, quantity, valid, scale=1.):
+        self._check_scale(scale)
+        np.add(self.sum, quantity, out=self.sum, where=valid)
+        np.maximum(self.max, quantity, out=self.max, where=valid)
+        self.count += valid
+        for i, thr in enumerate(self.thresholds):
+            self.exceed[i] += valid & (quantity >= thr / scale)
+        self.frames += 1
+
+    def subtract(self, quantity, valid, scale=1.):
+        """Remove a frame added before, e.g. for sliding windows.
+
+        The maximum can not be reverted, see SlidingAccumulator.
+        """
+        np.subtract(self.sum, quantity, out=self.sum, where=valid)
+        self.count -= valid
+        for i, thr in enumerate(self.thresholds):
+            self.exceed[i] -= valid & (quantity >= thr / scale)
+        self.frames -= 1
+
+    def add_file(self, fname):
+        values, flags, attrs = radolan.read_radolan(fname)
+        self.add(*frame_quantity(values, flags, attrs))
+
+    def merge(self, other):
+        if other.scale is None:
+            return self
+        self._check_scale(other.scale)
+        self.sum += other.sum
+        np.maximum(self.max, other.max, out=self.max)
+        self.count += other.count
+        self.exceed += other.exceed
+        self.frames += other.frames
+        return self
+
+    def result(self, stat='sum'):
+        """Return ``sum``, ``max``, ``mean`` (per valid frame) in physical
+        units, ``count`` of valid frames or ``exceed`` counts (first axis
+        along ``thresholds``)."""
+        scale = self.scale or 1.
+        if stat == 'sum':
+            return (self.sum * scale).astype(np.float32)
+        if stat == 'max':
+            return self.max * np.float32(scale)
+        if stat == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return (self.sum * scale / self.count).astype(np.float32)
+        if stat == 'count':
+            return self.count
+        if stat == 'exceed':
+            return self.exceed
+        raise ValueError("Unknown statistic {0}".format(stat))
+
+    def _check_scale(self, scale):
+        if self.scale is None:
+            self.scale = scale
+        elif self.scale != scale:
+            raise ValueError("Frames with different precision "
+                             "({0} vs. {1})".format(self.scale, scale))
+
+
+def accumulate_files(filelist, shape, thresholds=()):
+    acc = Accumulator(shape, thresholds)
+    for fname in filelist:
+        acc.add_file(fname)
+    return acc
+
+
+def accumulate(filelist, thresholds=(), processes=None, chunksize=24):
+    """Accumulate ``filelist`` over a process pool.
+
+    Every worker streams through chunks of ``chunksize`` files, so only
+    one partial Accumulator per chunk travels back to this process.
+    """
+    _, _, attrs = radolan.read_radolan(filelist[0], loaddata=False)
+    shape = (attrs['nrow'], attrs['ncol'])
+    chunks = [filelist[i:i + chunksize]
+              for i in range(0, len(filelist), chunksize)]
+    acc = Accumulator(shape, thresholds)
+    if processes == 1 or len(chunks) == 1:
+        for chunk in chunks:
+            acc.merge(accumulate_files(chunk, shape, thresholds))
+        return acc
+    with create_pool(processes) as pool:
+        for part in pool.map(accumulate_files, chunks,
+                             [shape] * len(chunks),
+                             [thresholds] * len(chunks)):
+            acc.merge(part)
+    return acc
+
+
+class SlidingAccumulator(object):
+    """
+    Accumulation over the last ``window`` frames.
+
+    Advancing by one frame adds the new frame and subtracts the expired
+    one. The window's frames are kept to subtract them later and to
+    recompute the maximum, which can not be updated incrementally. They
+    are kept as the integer counts they were pushed as, e.g. the frames
+    of the FrameLoader, and scaled again when they are needed.
+    """
+    def __init__(self, window, shape, thresholds=()):
+        self.window = window
+        self.acc = Accumulator(shape, thresholds)
+        self._frames = deque()
+        self._max_valid = True
+
+    def __len__(self):
+        return len(self._frames)
+
+    def push(self, counts, metadata):
+        """Add a frame of integer ``counts``, see :func:`counts_quantity`.
+        ``counts`` must not be changed later on."""
+        self.acc.add(*counts_quantity(counts, metadata))
+        self._frames.append((counts, metadata))
+        if len(self._frames) > self.window:
+            self.acc.subtract(*counts_quantity(*self._frames.popleft()))
+            self._max_valid = False
+
+    def push_file(self, fname):
+        self.push(*utils.read_radolan_counts(fname, cache=False))
+
+    def result(self, stat='sum'):
+        if stat == 'max' and not self._max_valid:
+            self.acc.max[:] = 0
+            for counts, metadata in self._frames:
+                quantity, valid, _ = counts_quantity(counts, metadata)
+                np.maximum(self.acc.max, quantity, out=self.acc.max,
+                           where=valid)
+            self._max_valid = True
+        return self.acc.result(stat)
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Benchmark suite
+
+Times header parsing, decoding, coordinate transforms, texture uploads
+and offscreen frame renders on synthetic RADOLAN files and writes the
+results to JSON, so runs can be compared over time.
+
+Usage: python -m rview.benchmark [--out results.json] [--frames 24]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import timeit
+import argparse
+import platform
+import tempfile
+import datetime as dt
+
+import numpy as np
+
+from rview import radolan, synthetic, utils
+
+
+def measure(func, repeat=5, number=1):
+    """Best and mean wall time of one call of ``func`` in seconds."""
+    times = np.array(timeit.repeat(func, repeat=repeat, number=number)) / number
+    return dict(best=float(times.min()), mean=float(times.mean()),
+                repeat=repeat, number=number)
+
+
+def per_file(func, files):
+    def run():
+        for f in files:
+            func(f)
+    return run
+
+
+def bench_io(workdir, products, frames):
+    import wradlib as wrl
+
+    results = {}
+    for product in products:
+        files = synthetic.write_series(os.path.join(workdir, product),
+                                       product, count=frames)
+        n = len(files)
+
+        def scaled(res):
+            # report times per file
+            res = dict(res)
+            res['best'] /= n
+            res['mean'] /= n
+            return res
+
+        results['header/rview/' + product] = scaled(measure(per_file(
+            lambda f: radolan.read_radolan(f, loaddata=False), files)))
+        results['decode/rview/' + product] = scaled(measure(per_file(
+            radolan.read_radolan, files)))
+        results['decode/rview-counts/' + product] = scaled(measure(per_file(
+            lambda f: utils.read_radolan_counts(f, cache=False), files)))
+        results['decode/rview-physical/' + product] = scaled(measure(
+            per_file(lambda f: utils.read_radolan(f, cache=False), files)))
+        results['decode/wradlib/' + product] = scaled(measure(per_file(
+            wrl.io.read_RADOLAN_composite, files)))
+    return results
+
+
+def bench_transforms(points=10000):
+    rng = np.random.RandomState(0)
+    lonlat = np.column_stack([rng.uniform(3, 15, points),
+                              rng.uniform(47, 55, points)])
+    pixels = rng.uniform(0, 899, (points, 2))
+    from rview.grid import get_grid
+    grid = get_grid()
+    grid.lonlat
+    transformer = utils.get_transformer()
+    return {
+        'transform/wgs84_to_radolan/{0}'.format(points):
+            measure(lambda: transformer.to_radolan(lonlat)),
+        'transform/radolan_to_wgs84/single':
+            measure(lambda: transformer.to_wgs84(pixels[0] + grid.origin),
+                    number=100),
+        'transform/pixel_to_lonlat/{0}'.format(points):
+            measure(lambda: grid.pixel_to_lonlat(pixels)),
+        'transform/pixel_to_lonlat/single':
+            measure(lambda: grid.pixel_to_lonlat(pixels[0]), number=100),
+    }
+
+
+def bench_gpu(workdir, frames, backend=None):
+    from rview.render import create_app
+    from rview.glcanvas import RadolanCanvas
+
+    files = synthetic.write_series(os.path.join(workdir, 'RX'), 'RX',
+                                   count=frames)
+    decoded = [utils.read_radolan_counts(f, cache=False) for f in files]
+    canvas = RadolanCanvas(ring_size=1, show=False, app=create_app(backend))
+    results = {}
+    try:
+        canvas.render()
+        for name, convert in (('uint8', lambda d: d),
+                              ('float32', lambda d: d.astype(np.float32))):
+            frames_ = [(convert(d), m) for d, m in decoded]
+            state = dict(i=0)
+
+            def upload():
+                counts, meta = frames_[state['i'] % len(frames_)]
+                state['i'] += 1
+                canvas.set_frame(counts, meta)
+                canvas.render()
+            results['gpu/set_data+render/' + name] = measure(upload,
+                                                             repeat=frames)
+        results['gpu/render'] = measure(canvas.render, repeat=frames)
+    finally:
+        canvas.close()
+    return results
+
+
+def environment():
+    import vispy
+    return dict(timestamp=dt.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+                platform=platform.platform(),
+                processor=platform.processor(),
+                cpus=os.cpu_count(),
+                python=sys.version.split()[0],
+                numpy=np.__version__,
+                vispy=vispy.__version__)
+
+
+def run(products=('RX', 'RW', 'PG'), frames=24, gpu=True, backend=None,
+        workdir=None):
+    """Run the suite, returns a JSON serializable dict."""
+    keep = workdir is not None
+    workdir = workdir or tempfile.mkdtemp(prefix='rview-bench-')
+    results = {}
+    skipped = {}
+    try:
+        results.update(bench_io(workdir, products, frames))
+        results.update(bench_transforms())
+        if gpu:
+            try:
+                results.update(bench_gpu(workdir, frames, backend))
+            except RuntimeError as err:
+                skipped['gpu'] = str(err)
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return dict(environment=environment(), frames=frames,
+                results=results, skipped=skipped)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="rview benchmark suite")
+    parser.add_argument('--out', default=None,
+                        help="JSON file, default: bench-<timestamp>.json")
+    parser.add_argument('--frames', type=int, default=24)
+    parser.add_argument('--products', default='RX,RW,PG')
+    parser.add_argument('--no-gpu', action='store_true')
+    parser.add_argument('--backend', default=None)
+    parser.add_argument('--workdir', default=None,
+                        help="keep the synthetic files here")
+    args = parser.parse_args()
+    report = run(products=args.products.split(','), frames=args.frames,
+                 gpu=not args.no_gpu, backend=args.backend,
+                 workdir=args.workdir)
+    out = args.out or time.strftime('bench-%Y%m%dT%H%M%S.json')
+    with open(out, 'w') as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+    for name in sorted(report['results']):
+        print("{0:45s} {1:10.3f} ms".format(
+            name, report['results'][name]['best'] * 1e3))
+    for name, reason in report['skipped'].items():
+        print("{0:45s} skipped: {1}".format(name, reason))
+    print("Results written to {0}".format(out))
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Parallel bulk decode into shared memory
+
+Decodes a whole file list on a process pool. The workers write the
+counts straight into one preallocated ``(time, nrow, ncol)`` array in
+``multiprocessing.shared_memory``; only the small metadata dicts travel
+back to the parent.
+"""
+
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from rview import utils
+
+
+def _decode_chunk(name, shape, dtype, start, filelist):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        frames = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        metadata = []
+        for i, fname in enumerate(filelist):
+            counts, meta = utils.read_radolan_counts(fname, cache=False)
+            frames[start + i] = counts
+            metadata.append(meta)
+        del frames
+    finally:
+        shm.close()
+    return start, metadata
+
+
+class BulkFrames(object):
+    """
+    All frames of ``filelist`` decoded into shared memory.
+
+    :meth:`load` blocks until every frame is decoded, so call it from a
+    thread; :meth:`get` returns frames as soon as their chunk arrived.
+    """
+    def __init__(self, filelist):
+        self.filelist = list(filelist)
+        counts, meta = utils.read_radolan_counts(self.filelist[0], cache=False)
+        self.shape = (len(self.filelist),) + counts.shape
+        self.dtype = counts.dtype
+        self._index = dict((f, i) for i, f in enumerate(self.filelist))
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=max(int(np.prod(self.shape)) *
+                                  self.dtype.itemsize, 1))
+        self.frames = np.ndarray(self.shape, dtype=self.dtype,
+                                 buffer=self._shm.buf)
+        self.metadata = [None] * len(self.filelist)
+        self.frames[0] = counts
+        self.metadata[0] = meta
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.filelist)
+
+    def loaded(self):
+        return sum(meta is not None for meta in self.metadata)
+
+    def load(self, pool=None, chunksize=8, progress=None):
+        """Decode all frames on a process ``pool``, by default a
+        temporary one from :func:`create_pool`. Keep a pool for repeated
+        loads, spawning the workers takes a few seconds.
+
+        ``progress(done, total, start, stop)`` is called for every chunk
+        of frames ``[start, stop)`` which arrived.
+        """
+        if pool is None:
+            with create_pool() as pool:
+                return self.load(pool, chunksize, progress)
+        total = len(self)
+        futures = [pool.submit(_decode_chunk, self._shm.name, self.shape,
+                               self.dtype, start,
+                               self.filelist[start:start + chunksize])
+                   for start in range(1, total, chunksize)]
+        for future in as_completed(futures):
+            if self._cancelled.is_set():
+                for other in futures:
+                    other.cancel()
+                break
+            start, metadata = future.result()
+            self.metadata[start:start + len(metadata)] = metadata
+            if progress is not None:
+                progress(self.loaded(), total, start, start + len(metadata))
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def get(self, item):
+        """``(counts, metadata)`` of a file of the list, None while it
+        is not decoded yet."""
+        index = self._index.get(item)
+        with self._lock:
+            if index is None or self.frames is None or \
+                    self.metadata[index] is None:
+                return None
+            # a copy, views would dangle once the segment is closed
+            return self.frames[index].copy(), dict(self.metadata[index])
+
+    def wrap(self, reader):
+        """Reader for FrameLoader, falling back to ``reader``."""
+        def read(item):
+            frame = self.get(item)
+            return reader(item) if frame is None else frame
+        return read
+
+    def close(self):
+        """Release the shared memory."""
+        self.cancel()
+        with self._lock:
+            self.frames = None
+            self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def create_pool(processes=None):
+    # spawned workers do not inherit the GUI's threads and GL state
+    ctx = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=processes, mp_context=ctx)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Decoded-frame cache
+
+Keeps parsed headers and decoded arrays of RADOLAN files in memory,
+keyed on path, mtime and size, with LRU eviction under a byte budget.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+def file_key(path):
+    """Return a cache key which changes when the file is rewritten."""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime, st.st_size
+
+
+class FrameCache(object):
+    """
+    LRU cache of ``(data, metadata)`` tuples.
+
+    Entries may hold the metadata only (from header reads), so a later
+    full read of the same file is still counted as a miss. ``maxbytes``
+    limits the summed ``nbytes`` of the cached arrays.
+    """
+    def __init__(self, maxbytes=2 * 2**30):
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, loaddata=True):
+        """Return ``(data, metadata)`` for ``key`` or None on a miss.
+
+        With ``loaddata=False`` any entry is a hit and data is None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (loaddata and entry[0] is None):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            data, meta = entry
+        if not loaddata:
+            data = None
+        return data, dict(meta)
+
+    def put(self, key, data, meta):
+        """Store a frame, ``data`` may be None for header-only reads."""
+        if data is not None:
+            # cached arrays are shared between callers
+            data.flags.writeable = False
+            size = data.nbytes
+            if size > self.maxbytes:
+                data, size = None, 0
+        else:
+            size = 0
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                if old[0] is not None:
+                    self.nbytes -= old[0].nbytes
+                if data is None:
+                    data = old[0]
+                    size = 0 if data is None else data.nbytes
+            self._entries[key] = (data, dict(meta))
+            self.nbytes += size
+            self._evict()
+
+    def resize(self, maxbytes):
+        with self._lock:
+            self.maxbytes = maxbytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, entries=len(self),
+                    nbytes=self.nbytes, maxbytes=self.maxbytes)
+
+    def _evict(self):
+        # headers are tiny, only entries holding data count against the budget
+        while self.nbytes > self.maxbytes:
+            for key, (data, meta) in self._entries.items():
+                if data is not None:
+                    break
+            self.nbytes -= data.nbytes
+            del self._entries[key]
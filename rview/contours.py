@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Contour lines
+
+Vectorized marching squares on a frame, giving line segments for
+``scene.visuals.Line(connect='segments')``. ContourWorker extracts them
+on a thread and keeps them per frame and level set, so showing a frame
+again reuses its contours.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from PyQt4 import QtCore
+
+from rview.cache import FrameCache
+from rview.profiling import timings
+
+# cell edges 0 top, 1 right, 2 bottom, 3 left as (row, col) offsets of
+# their two corners
+_EDGE_CORNERS = np.array([[(0, 0), (0, 1)],
+                          [(0, 1), (1, 1)],
+                          [(1, 0), (1, 1)],
+                          [(0, 0), (1, 0)]])
+
+# segments per cell case, case bits are 8 top left, 4 top right,
+# 2 bottom right, 1 bottom left corner at or above the level
+_SEGMENTS = {
+    1: [(3, 2)], 2: [(2, 1)], 3: [(3, 1)], 4: [(0, 1)],
+    5: [(0, 1), (3, 2)], 6: [(0, 2)], 7: [(0, 3)], 8: [(0, 3)],
+    9: [(0, 2)], 10: [(0, 3), (2, 1)], 11: [(0, 1)], 12: [(3, 1)],
+    13: [(2, 1)], 14: [(3, 2)],
+}
+# saddles with the cell center at or above the level connect the
+# corners above, cutting off the two others instead
+_SADDLES = {5: [(0, 3), (2, 1)], 10: [(0, 1), (3, 2)]}
+
+
+def _table(segments):
+    table = -np.ones((16, 2, 2), dtype=np.intp)
+    for case, segs in segments.items():
+        for k, seg in enumerate(segs):
+            table[case, k] = seg
+    return table
+
+
+_TABLE = _table(_SEGMENTS)
+_SADDLE_TABLE = _table(dict(list(_SEGMENTS.items()) + list(_SADDLES.items())))
+
+
+def _edge_points(data, level, i, j, edges):
+    corners = _EDGE_CORNERS[edges]
+    i0 = i + corners[:, 0, 0]
+    j0 = j + corners[:, 0, 1]
+    i1 = i + corners[:, 1, 0]
+    j1 = j + corners[:, 1, 1]
+    a = data[i0, j0]
+    b = data[i1, j1]
+    # the level lies between a and b, so b != a
+    t = (level - a) / (b - a)
+    # Image pixels are centered at +0.5
+    x = j0 + t * (j1 - j0) + 0.5
+    y = i0 + t * (i1 - i0) + 0.5
+    return np.column_stack([x, y]).astype(np.float32)
+
+
+def marching_squares(data, level):
+    """Isoline of ``data`` at ``level``.
+
+    Returns
+    -------
+    vertices : float32 array of shape (2 * nsegments, 2)
+        (x, y) pixel coordinates, each pair of rows is one segment
+    """
+    data = np.asarray(data, dtype=np.float32)
+    above = data >= level
+    case = (above[:-1, :-1] * np.uint8(8) | above[:-1, 1:] * np.uint8(4) |
+            above[1:, 1:] * np.uint8(2) | above[1:, :-1] * np.uint8(1))
+    i, j = np.nonzero((case != 0) & (case != 15))
+    case = case[i, j]
+    segments = _TABLE[case]
+    saddle = np.flatnonzero((case == 5) | (case == 10))
+    if saddle.size:
+        si, sj = i[saddle], j[saddle]
+        center = (data[si, sj] + data[si, sj + 1] + data[si + 1, sj] +
+                  data[si + 1, sj + 1]) / 4.
+        connect = saddle[center >= level]
+        segments[connect] = _SADDLE_TABLE[case[connect]]
+    parts = []
+    for k in range(2):
+        valid = np.flatnonzero(segments[:, k, 0] >= 0)
+        if not valid.size:
+            continue
+        vi, vj = i[valid], j[valid]
+        start = _edge_points(data, level, vi, vj, segments[valid, k, 0])
+        stop = _edge_points(data, level, vi, vj, segments[valid, k, 1])
+        # interleave start and stop points of every segment
+        parts.append(np.stack([start, stop], axis=1).reshape(-1, 2))
+    if not parts:
+        return np.zeros((0, 2), dtype=np.float32)
+    return np.concatenate(parts)
+
+
+def contour_segments(data, levels, nodata=None):
+    """Segments of all ``levels``, concatenated. Pixels holding the
+    ``nodata`` count are contoured like no rain."""
+    data = np.asarray(data, dtype=np.float32)
+    if nodata is not None:
+        # the float copy above is ours, mark it in place
+        data[data == nodata] = 0
+    parts = [marching_squares(data, level) for level in levels]
+    if not parts:
+        return np.zeros((0, 2), dtype=np.float32)
+    return np.concatenate(parts)
+
+
+class ContourWorker(QtCore.QObject):
+    """
+    Extracts contours on a worker thread and caches them.
+
+    :meth:`request` returns cached segments right away, otherwise
+    ``signal_contours_ready`` is emitted with the request key once they
+    are available from :meth:`get`.
+    """
+    signal_contours_ready = QtCore.pyqtSignal(object, name='contoursReady')
+
+    def __init__(self, maxbytes=128 * 2**20, workers=1, parent=None):
+        super(ContourWorker, self).__init__(parent)
+        self.cache = FrameCache(maxbytes)
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    @staticmethod
+    def make_key(key, levels, precision):
+        return key, tuple(levels), precision
+
+    def get(self, ckey):
+        hit = self.cache.get(ckey)
+        return None if hit is None else hit[0]
+
+    def request(self, key, counts, precision, levels, nodata=None):
+        """Contours of ``counts * precision`` at physical ``levels``,
+        ``nodata`` counts are taken as no rain.
+
+        Returns the segments if cached, else None and computes them.
+        """
+        ckey = self.make_key(key, levels, precision)
+        vertices = self.get(ckey)
+        if vertices is not None:
+            return vertices
+        with self._lock:
+            # only the newest frame matters, e.g. during playback
+            for other, future in list(self._pending.items()):
+                if other != ckey and future.cancel():
+                    del self._pending[other]
+            if ckey not in self._pending:
+                self._pending[ckey] = self._pool.submit(
+                    self._compute, ckey, counts,
+                    [level / precision for level in levels], nodata)
+        return None
+
+    def clear(self):
+        self.cache.clear()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    def _compute(self, ckey, counts, levels, nodata):
+        try:
+            with timings.stage('contours'):
+                vertices = contour_segments(counts, levels, nodata)
+            self.cache.put(ckey, vertices, {})
+        finally:
+            with self._lock:
+                self._pending.pop(ckey, None)
+        self.signal_contours_ready.emit(ckey)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Integer counts colored in the fragment shader
+
+Frames are uploaded as the raw counts of the decoder into a texture of
+their own, without any conversion on the CPU. The shader scales them
+back from the normalized texture values, discards pixels holding the
+reserved nodata count (``metadata['nodata']``, see
+:func:`rview.utils.read_radolan_counts`) and maps the others through the
+color limits and a lookup table of the colormap.
+"""
+
+import numpy as np
+
+from vispy import gloo, scene
+from vispy.color import get_colormap
+from vispy.visuals.shaders import Function
+from vispy.visuals.transforms import STTransform
+
+
+def texture_counts(counts):
+    """Return ``(data, norm, wrap)`` to upload ``counts`` with.
+
+    OpenGL normalizes integer texture data to [0, 1], ``count = round(
+    value * norm)``. Signed counts are uploaded as their unsigned bit
+    pattern, as the normalization of signed data differs between OpenGL
+    versions, counts above ``wrap`` are negative then.
+    """
+    data = np.ascontiguousarray(counts)
+    if data.dtype.kind == 'f':
+        return data.astype(np.float32, copy=False), 1., np.inf
+    wrap = float(np.iinfo(data.dtype).max)
+    if data.dtype.kind == 'i':
+        data = data.view(data.dtype.str.replace('i', 'u'))
+    return data, float(np.iinfo(data.dtype).max), wrap
+
+
+def nodata_uniform(nodata):
+    # a count no texture can hold, if the frame has no nodata value
+    return -1e9 if nodata is None else float(nodata)
+
+
+class CountsTexture(object):
+    """
+    Texture of integer counts and the scaling the shader needs to read
+    them back, see texture_counts. Shared by CountsFilter and the
+    comparison, which binds the texture of the shown frame.
+    """
+    def __init__(self):
+        self.texture = gloo.Texture2D(np.zeros((1, 1), dtype=np.uint8),
+                                      format='luminance', internalformat='r32f',
+                                      interpolation='nearest')
+        self.norm, self.wrap, self.nodata = 255., 255., None
+
+    def set_data(self, counts, nodata=None):
+        """Upload integer ``counts``, pixels equal to ``nodata`` are
+        not drawn."""
+        data, self.norm, self.wrap = texture_counts(counts)
+        self.nodata = nodata
+        self.texture.set_data(data)
+
+    def bind(self, fshader, suffix=''):
+        """Set ``$frame``, ``$norm``, ``$wrap`` and ``$nodata`` (with
+        ``suffix``) of ``fshader``."""
+        fshader['frame' + suffix] = self.texture
+        fshader['norm' + suffix] = self.norm
+        fshader['wrap' + suffix] = min(self.wrap, 1e9)
+        fshader['nodata' + suffix] = nodata_uniform(self.nodata)
+
+
+class CountsFilter(object):
+    """
+    Colors the counts of its texture, discarding nodata pixels.
+
+    Attach it to an Image spanning the grid with data of shape (1, 1),
+    its visual coordinates are the texture coordinates then, see
+    CountsImage. ``clim`` is in counts.
+    """
+    def __init__(self, cmap='grays', clim=(0, 1)):
+        self.fshader = Function("""
+            void counts() {
+                vec4 pos = $fb_to_visual(gl_FragCoord);
+                vec2 texcoord = pos.xy / pos.w;
+                float count = floor(texture2D($frame, texcoord).r * $norm + 0.5);
+                if (count > $wrap) {
+                    count -= $norm + 1.0;
+                }
+                if (abs(count - $nodata) < 0.5) {
+                    discard;
+                }
+                float t = clamp((count - $clim.x) / ($clim.y - $clim.x), 0.0, 1.0);
+                gl_FragColor = texture2D($lut, vec2(t, 0.5));
+            }
+        """)
+        self.counts = CountsTexture()
+        self.lut = gloo.Texture2D(np.zeros((1, 256, 4), dtype=np.float32),
+                                  interpolation='linear')
+        self.fshader['lut'] = self.lut
+        self.counts.bind(self.fshader)
+        self.cmap = cmap
+        self.clim = clim
+        self._transform = None
+        self.counts_expr = self.fshader()
+
+    def set_data(self, counts, nodata=None):
+        self.counts.set_data(counts, nodata)
+        self.counts.bind(self.fshader)
+
+    @property
+    def cmap(self):
+        return self._cmap
+
+    @cmap.setter
+    def cmap(self, cmap):
+        self._cmap = get_colormap(cmap)
+        lut = self._cmap.map(np.linspace(0., 1., 256))
+        self.lut.set_data(np.asarray(lut, dtype=np.float32).reshape(1, 256, 4))
+
+    @property
+    def clim(self):
+        return self._clim
+
+    @clim.setter
+    def clim(self, c):
+        self._clim = c
+        self.fshader['clim'] = (float(c[0]), float(c[1]))
+
+    @property
+    def transform(self):
+        return self._transform
+
+    @transform.setter
+    def transform(self, tr):
+        self._transform = tr
+        self.fshader['fb_to_visual'] = tr
+
+    def _attach(self, visual):
+        hook = visual._get_hook('frag', 'post')
+        hook.add(self.counts_expr)
+
+
+class _CountsQuad(scene.visuals.Image):
+    # one texel spanning the grid, colored by the filter
+    def __init__(self, counts_filter, parent=None):
+        super(_CountsQuad, self).__init__(np.zeros((1, 1), dtype=np.float32),
+                                          method='subdivide', clim=(0, 1),
+                                          parent=parent)
+        self.unfreeze()
+        self.transform = STTransform()
+        self.counts_filter = counts_filter
+        self.freeze()
+        # first in the hook, later filters see the colored counts
+        self.attach(counts_filter)
+
+    def draw(self, *args):
+        # the mapping follows camera, canvas size and parents, setting
+        # an unchanged transform again is a no-op
+        self.counts_filter.transform = self.get_transform('framebuffer', 'visual')
+        return super(_CountsQuad, self).draw(*args)
+
+
+class CountsImage(scene.Node):
+    """
+    Scene node showing integer counts, used like an Image.
+
+    Pixel ``(row, col)`` covers ``[col, col + 1] x [row, row + 1]`` of the
+    node coordinates, as with Image. ``clim`` is in counts, filters are
+    attached behind the CountsFilter.
+    """
+    def __init__(self, data=None, cmap='grays', clim=(0, 1), nodata=None,
+                 parent=None):
+        super(CountsImage, self).__init__(parent=parent)
+        self.filter = CountsFilter(cmap, clim)
+        self.shape = (1, 1)
+        self._quad = _CountsQuad(self.filter, parent=self)
+        if data is not None:
+            self.set_data(data, nodata)
+
+    @property
+    def counts(self):
+        """The CountsTexture holding the frame."""
+        return self.filter.counts
+
+    def set_data(self, counts, nodata=None):
+        self.filter.set_data(counts, nodata)
+        self.shape = counts.shape
+        self._quad.transform.scale = (counts.shape[1], counts.shape[0], 1)
+
+    @property
+    def cmap(self):
+        return self.filter.cmap
+
+    @cmap.setter
+    def cmap(self, cmap):
+        self.filter.cmap = cmap
+        self.update()
+
+    @property
+    def clim(self):
+        return self.filter.clim
+
+    @clim.setter
+    def clim(self, clim):
+        self.filter.clim = clim
+        self.update()
+
+    def attach(self, filt):
+        self._quad.attach(filt)
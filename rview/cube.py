@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+RADOLAN netCDF4 time cube
+
+Converts a directory of RADOLAN composites into one chunked, compressed
+netCDF4 file (time x y x x) holding the raw integer counts, and reads
+frames, point time series and aggregates back from it.
+
+Usage: python -m rview.cube <directory> <outfile.nc>
+"""
+
+import os
+import glob
+import argparse
+import threading
+
+import numpy as np
+
+from rview import radolan
+from rview.grid import get_grid
+
+TIME_UNITS = 'seconds since 1970-01-01 00:00:00'
+
+def ingest(dirname, outfile, pattern='raa01*', chunks=(12, 150, 150),
+           complevel=4, product=None):
+    """Write all RADOLAN files in ``dirname`` into one netCDF4 cube.
+
+    Parameters
+    ----------
+    dirname : directory holding the RADOLAN files
+    outfile : name of the netCDF4 file to create
+    pattern : glob pattern of the files to ingest
+    chunks : chunk shape (time, y, x), balances frame reads against
+             point time series
+    complevel : zlib compression level of every chunk
+    product : product type to ingest, e.g. 'RW', by default the one of
+              the first file. Files of other products are skipped.
+
+    Returns
+    -------
+    count : number of ingested frames
+    """
+    import netCDF4 as nc
+
+    filelist = sorted(glob.glob(os.path.join(dirname, pattern)))
+    if not filelist:
+        raise IOError("No RADOLAN files found in {0}".format(dirname))
+
+    headers = [radolan.read_radolan(fname, loaddata=False)[2]
+               for fname in filelist]
+    if product is None:
+        product = headers[0]['producttype']
+    filelist = [fname for fname, attrs in zip(filelist, headers)
+                if attrs['producttype'] == product]
+    if not filelist:
+        raise IOError("No {0} files found in {1}".format(product, dirname))
+
+    attrs = headers[[h['producttype'] for h in headers].index(product)]
+    nrow, ncol = attrs['nrow'], attrs['ncol']
+    dtype, fill = radolan.storage(attrs['producttype'])
+    chunks = (chunks[0], min(chunks[1], nrow), min(chunks[2], ncol))
+
+    with nc.Dataset(outfile, 'w', format='NETCDF4') as ds:
+        ds.createDimension('time', None)
+        ds.createDimension('y', nrow)
+        ds.createDimension('x', ncol)
+
+        time = ds.createVariable('time', np.float64, ('time',))
+        time.units = TIME_UNITS
+        time.calendar = 'standard'
+
+        # polar stereographic coordinates of the lower left pixel corners
+        xy = get_grid(nrow, ncol).xy
+        x = ds.createVariable('x', np.float64, ('x',))
+        x.units = 'km'
+        x[:] = xy[0, :, 0]
+        y = ds.createVariable('y', np.float64, ('y',))
+        y.units = 'km'
+        y[:] = xy[:, 0, 1]
+
+        data = ds.createVariable('data', dtype, ('time', 'y', 'x'),
+                                 zlib=True, complevel=complevel, shuffle=True,
+                                 chunksizes=chunks, fill_value=fill)
+        if attrs['producttype'] not in radolan.BYTE_PRODUCTS:
+            data.scale_factor = attrs.get('precision', 1.)
+        data.producttype = attrs['producttype']
+        ds.radolanversion = attrs.get('radolanversion', '')
+
+        # raw counts are written as they are, bypassing the scale_factor
+        data.set_auto_maskandscale(False)
+
+        # write whole time chunks at once
+        buf = np.empty((chunks[0], nrow, ncol), dtype=dtype)
+        times = []
+        start = 0
+        for i, fname in enumerate(filelist):
+            values, flags, meta = radolan.read_radolan(fname)
+            if values.shape != (nrow, ncol):
+                raise ValueError("{0} has shape {1}, the cube {2}".format(
+                    fname, values.shape, (nrow, ncol)))
+            if product not in radolan.RUNLENGTH_PRODUCTS and \
+                    not np.can_cast(values.dtype, dtype):
+                raise ValueError("{0} holds {1} counts, the cube {2}".format(
+                    fname, values.dtype, np.dtype(dtype)))
+            slot = i % chunks[0]
+            np.copyto(buf[slot], values, casting='unsafe')
+            buf[slot][(flags & radolan.FLAG_NODATA).astype(bool)] = fill
+            times.append(nc.date2num(meta['datetime'], TIME_UNITS))
+            if slot == chunks[0] - 1 or i == len(filelist) - 1:
+                stop = i + 1
+                data[start:stop] = buf[:stop - start]
+                time[start:stop] = times[start:stop]
+                start = stop
+
+    return len(filelist)
+
+
+def _num2date(values, units, calendar):
+    import netCDF4 as nc
+    # netCDF4 >= 1.4 returns cftime objects unless told otherwise
+    try:
+        return nc.num2date(values, units, calendar,
+                           only_use_cftime_datetimes=False,
+                           only_use_python_datetimes=True)
+    except TypeError:
+        return nc.num2date(values, units, calendar)
+
+
+class RadolanCube(object):
+    """
+    Read access to a cube written by :func:`ingest`.
+
+    Reads are serialized, as HDF5 must not be entered from several
+    threads at once (e.g. from the worker threads of the FrameLoader).
+    Closing takes the same lock, reads of a closed cube raise IOError.
+    """
+    def __init__(self, fname):
+        # netCDF4 is only needed once a cube is opened
+        import netCDF4 as nc
+        self.filename = fname
+        self._lock = threading.Lock()
+        self.closed = False
+        self.ds = nc.Dataset(fname, 'r')
+        self.data = self.ds.variables['data']
+        time = self.ds.variables['time']
+        self.times = _num2date(time[:], time.units,
+                               getattr(time, 'calendar', 'standard'))
+        self.producttype = self.data.producttype
+        self.precision = getattr(self.data, 'scale_factor', 1.)
+        self.shape = self.data.shape
+
+    def __len__(self):
+        return self.shape[0]
+
+    def close(self):
+        # waits for a running read, later ones see the flag
+        with self._lock:
+            self.closed = True
+            self.ds.close()
+
+    def _check_open(self):
+        if self.closed:
+            raise IOError("{0} is closed".format(self.filename))
+
+    def metadata(self, index):
+        return dict(datetime=self.times[index],
+                    producttype=self.producttype,
+                    precision=self.precision,
+                    nrow=self.shape[1], ncol=self.shape[2])
+
+    def read_frame(self, index, missing=0):
+        """Return ``(data, metadata)`` like :func:`rview.utils.read_radolan`."""
+        with self._lock:
+            self._check_open()
+            data = self.data[index]
+        return np.ma.filled(data, missing).astype(np.float64), \
+            self.metadata(index)
+
+    def read_counts(self, index):
+        """Return ``(counts, metadata)`` like
+        :func:`rview.utils.read_radolan_counts`.
+        """
+        with self._lock:
+            self._check_open()
+            self.data.set_auto_maskandscale(False)
+            try:
+                counts = self.data[index]
+            finally:
+                self.data.set_auto_maskandscale(True)
+        # nodata pixels keep the fill value, see read_radolan_counts
+        metadata = self.metadata(index)
+        metadata['nodata'] = int(self.data._FillValue)
+        return counts, metadata
+
+    def timeseries(self, row, col, start=0, stop=None, missing=np.nan):
+        """Return ``(times, values)`` of one pixel in a single read."""
+        with self._lock:
+            self._check_open()
+            values = self.data[start:stop, row, col]
+        return self.times[start:stop], \
+            np.ma.filled(values.astype(np.float64), missing)
+
+    def aggregate(self, start=0, stop=None, how='sum'):
+        """Sum, maximum or mean of the frames in ``[start, stop)``.
+
+        The range is read in slabs of whole time chunks. An empty range
+        raises ValueError.
+        """
+        stop = len(self) if stop is None else stop
+        if min(stop, len(self)) <= start:
+            raise ValueError("Empty frame range [{0}, {1})".format(start, stop))
+        stop = min(stop, len(self))
+        chunking = self.data.chunking()
+        step = chunking[0] if isinstance(chunking, list) else 1
+        result = None
+        for i in range(start, stop, step):
+            with self._lock:
+                self._check_open()
+                slab = self.data[i:min(i + step, stop)]
+            slab = np.ma.filled(slab.astype(np.float64), 0)
+            if how == 'max':
+                part = slab.max(axis=0)
+                result = part if result is None else \
+                    np.maximum(result, part)
+            else:
+                part = slab.sum(axis=0)
+                result = part if result is None else result + part
+        if how == 'mean':
+            result /= (stop - start)
+        return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Ingest a directory of RADOLAN files into a "
+                    "netCDF4 time cube")
+    parser.add_argument('dirname')
+    parser.add_argument('outfile')
+    parser.add_argument('--pattern', default='raa01*')
+    parser.add_argument('--chunks', default='12,150,150',
+                        help="chunk shape time,y,x")
+    parser.add_argument('--complevel', type=int, default=4)
+    parser.add_argument('--product', default=None,
+                        help="product type, by default the one of the first file")
+    args = parser.parse_args()
+    count = ingest(args.dirname, args.outfile, pattern=args.pattern,
+                   chunks=tuple(int(c) for c in args.chunks.split(',')),
+                   complevel=args.complevel, product=args.product)
+    print("Ingested {0} frames into {1}".format(count, args.outfile))
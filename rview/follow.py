@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Follow a directory while new RADOLAN files arrive
+
+Uses QFileSystemWatcher (inotify on Linux) and polls in addition, as on
+network mounts (NFS, CIFS) the watch succeeds but change notifications
+are never delivered. A poll only lists the directory, only the names of
+the files are compared. Headers of new files are added to the
+HeaderIndex without rescanning the directory.
+"""
+
+import os
+import fnmatch
+
+from PyQt4 import QtCore
+
+
+class DirectoryFollower(QtCore.QObject):
+    """
+    Watches ``index.dirname`` and emits ``signal_new_entries`` with the
+    index entries of files which appeared since the last check.
+    """
+    signal_new_entries = QtCore.pyqtSignal(list, name='newEntries')
+
+    def __init__(self, index, poll_interval=5000, parent=None):
+        super(DirectoryFollower, self).__init__(parent)
+        self.index = index
+        self._known = set(e['name'] for e in index.entries)
+
+        # debounce bursts of change notifications while a file is written
+        self._settle = QtCore.QTimer(self)
+        self._settle.setSingleShot(True)
+        self._settle.setInterval(1000)
+        self._settle.timeout.connect(self.check)
+
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._changed)
+        self.watcher.addPath(index.dirname)
+
+        self.poller = QtCore.QTimer(self)
+        self.poller.setInterval(poll_interval)
+        self.poller.timeout.connect(self.check)
+        self.poller.start()
+
+    def stop(self):
+        self._settle.stop()
+        self.poller.stop()
+        self.watcher.removePaths(self.watcher.directories())
+
+    def _changed(self, path):
+        self._settle.start()
+
+    def check(self):
+        try:
+            names = os.listdir(self.index.dirname)
+        except OSError:
+            return
+        new = sorted(n for n in fnmatch.filter(names, self.index.pattern)
+                     if n not in self._known)
+        if not new:
+            return
+        paths = [os.path.join(self.index.dirname, n) for n in new]
+        entries = self.index.add(paths)
+        if len(entries) < len(new):
+            # a file is still being written, retry it shortly
+            self._settle.start()
+        self._known.update(e['name'] for e in entries)
+        if entries:
+            self.signal_new_entries.emit(entries)
@@ -9,18 +9,19 @@
 """
 
 import numpy as np
-import glob
-import netCDF4 as nc
+from collections import OrderedDict
 
-from vispy import scene, visuals
+from vispy import app, scene, visuals
 from vispy.util.event import EventEmitter
 from vispy.visuals.shaders import Function, FunctionChain
 from vispy.color import Color, get_colormap, Colormap
 from vispy.visuals.transforms import STTransform
 
-import wradlib as wrl
-
 from rview import utils
+from rview.counts import CountsImage, CountsTexture
+from rview.grid import get_grid
+from rview.profiling import timings
+from rview.tiles import TiledImage
 
 def get_cities_coords():
 
@@ -217,11 +218,142 @@ class ContourFilter(object):
         hook.add(self.isoline_expr)
 
 
+class CompareFilter(object):
+    """
+    Difference, ratio or masked change of two frames in the fragment shader.
+
+    Both frames are CountsTextures bound with :meth:`bind`, e.g. the one
+    of the shown frame in the ring, so switching frames uploads nothing
+    and nothing is computed on the CPU. Attach it to an Image spanning
+    the grid with data of shape (1, 1), its visual coordinates are the
+    texture coordinates then. Values are drawn with a diverging ramp of
+    ``colors`` over ``clim``, masked and nodata pixels are discarded.
+    """
+    modes = ('difference', 'ratio', 'change')
+
+    def __init__(self, colors=('#2166ac', '#f7f7f7', '#b2182b')):
+        self.fshader = Function("""
+            void compare() {
+                vec4 pos = $fb_to_visual(gl_FragCoord);
+                vec2 texcoord = pos.xy / pos.w;
+                float count_a = floor(texture2D($frame_a, texcoord).r * $norm_a + 0.5);
+                if (count_a > $wrap_a) {
+                    count_a -= $norm_a + 1.0;
+                }
+                float count_b = floor(texture2D($frame_b, texcoord).r * $norm_b + 0.5);
+                if (count_b > $wrap_b) {
+                    count_b -= $norm_b + 1.0;
+                }
+                if (abs(count_a - $nodata_a) < 0.5 || abs(count_b - $nodata_b) < 0.5) {
+                    discard;
+                }
+                float a = count_a * $precision_a;
+                float b = count_b * $precision_b;
+                float value = a - b;
+                if ($mode > 0.5 && $mode < 1.5) {
+                    // ratio, undefined without partner value
+                    if (b <= 0.0) {
+                        discard;
+                    }
+                    value = a / b;
+                }
+                if ($mode > 1.5 && abs(value) < $threshold) {
+                    // masked change, small differences show the frame below
+                    discard;
+                }
+                float t = clamp((value - $clim.x) / ($clim.y - $clim.x), 0.0, 1.0);
+                if (t < 0.5) {
+                    gl_FragColor = mix($color_low, $color_mid, 2.0 * t);
+                } else {
+                    gl_FragColor = mix($color_mid, $color_high, 2.0 * t - 1.0);
+                }
+            }
+        """)
+        self.frames = {}
+        empty = CountsTexture()
+        for which in ('a', 'b'):
+            self.bind(which, empty)
+        self.fshader['color_low'] = Color(colors[0]).rgba
+        self.fshader['color_mid'] = Color(colors[1]).rgba
+        self.fshader['color_high'] = Color(colors[2]).rgba
+        # the same ramp for the colorbar
+        self.cmap = Colormap(list(colors))
+        self.mode = 'difference'
+        self.threshold = 0.
+        self.clim = (-1., 1.)
+        self._transform = None
+        self.compare_expr = self.fshader()
+
+    def bind(self, which, counts, precision=1.):
+        """Compare CountsTexture ``counts`` as frame 'a' or 'b', physical
+        values are ``counts * precision``. Binding is free, the texture
+        is not uploaded again."""
+        self.frames[which] = counts
+        counts.bind(self.fshader, '_' + which)
+        self.fshader['precision_' + which] = float(precision)
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @mode.setter
+    def mode(self, m):
+        self._mode = m
+        self.fshader['mode'] = float(self.modes.index(m))
+
+    @property
+    def threshold(self):
+        return self._threshold
+
+    @threshold.setter
+    def threshold(self, t):
+        self._threshold = t
+        self.fshader['threshold'] = float(t)
+
+    @property
+    def clim(self):
+        return self._clim
+
+    @clim.setter
+    def clim(self, c):
+        self._clim = c
+        self.fshader['clim'] = (float(c[0]), float(c[1]))
+
+    @property
+    def transform(self):
+        return self._transform
+
+    @transform.setter
+    def transform(self, tr):
+        self._transform = tr
+        self.fshader['fb_to_visual'] = tr
+
+    def _attach(self, visual):
+        hook = visual._get_hook('frag', 'post')
+        hook.add(self.compare_expr)
+
+
+class LinkedView(object):
+    """View of another product right of the main view, see
+    RadolanCanvas.set_linked_products."""
+    def __init__(self, view, image, label):
+        self.view = view
+        self.image = image
+        self.label = label
+        self.precision = 1.
+        self.shape = None
+
+
 class RadolanCanvas(scene.SceneCanvas):
 
-    def __init__(self):
-        scene.SceneCanvas.__init__(self, keys='interactive')
-        self.size = 1400, 1300
+    # grids with a side longer than this are drawn as tile pyramid
+    tile_threshold = 2048
+
+    def __init__(self, ring_size=12, size=(1400, 1300), grid_shape=(900, 900),
+                 **kwargs):
+        # kwargs go to SceneCanvas, e.g. show=False and an offscreen app
+        scene.SceneCanvas.__init__(self, keys='interactive', size=size,
+                                   **kwargs)
         self.unfreeze()
 
         #self.view = self.central_widget.add_view()
@@ -229,21 +361,28 @@ class RadolanCanvas(scene.SceneCanvas):
 
         self.b1 = self.grid.add_view(row=0, col=0)
         self.b1.border_color = (0.5, 0.5, 0.5, 1)
-        self.b1.camera = scene.PanZoomCamera(rect=(0,0,1000,900), aspect=1)
+        self.shape = tuple(grid_shape)
+        self.b1.camera = scene.PanZoomCamera(rect=self._camera_rect(), aspect=1)
 
         # signal emitters
         self.line_changed = EventEmitter(source=self, type="line_changed")
         self.mouse_moved = EventEmitter(source=self, type="mouse_moved")
+        self.mouse_clicked = EventEmitter(source=self, type="mouse_clicked")
+        self.fps_measured = EventEmitter(source=self, type="fps_measured")
+        # messages for the user, e.g. in the status bar, in event.text
+        self.message = EventEmitter(source=self, type="message")
         self.events.mouse_double_click.block()
 
-        img_data = np.zeros((900, 900))
-        self.X, self.Y = np.meshgrid(np.arange(img_data.shape[0]),np.arange(img_data.shape[1]))
+        # counts are uploaded in their native dtype, clim and nodata
+        # are applied in the shader (see set_frame)
+        img_data = np.zeros(self.shape, dtype=np.uint8)
+        self.clim = (0, 100)
+        self.precision = 1.
 
         #cmap = 'grays'
         cmap = 'grays'
 
-        self.image = scene.visuals.Image(img_data, method='impostor', #interpolation='bicubic',
-                                         cmap=cmap, parent=self.b1.scene)
+        self.image = self.create_image(img_data, cmap)
 
         level = 21
         self.iso = ContourFilter(level=level, width=0.01, color='black', cmap=cmap)
@@ -252,7 +391,8 @@ class RadolanCanvas(scene.SceneCanvas):
         #self.image.attach(bta)
 
         self.cbar = scene.visuals.ColorBar(center_pos=(0, 900), size=np.array([850, 20]),
-                                           cmap=cmap, label_str='measurement units', orientation='right',
+                                           cmap=cmap, clim=self.clim,
+                                           label_str='measurement units', orientation='right',
                                            border_width=1, border_color='white', parent=self.b1.scene)
         self.cbar._colorbar.attach(self.iso)
 
@@ -264,18 +404,66 @@ class RadolanCanvas(scene.SceneCanvas):
             tick.color = 'white'
 
 
-        self.image.transform = visuals.transforms.STTransform(translate=(0, 0, 60))
         self.image.visible = True
-        self.cbar.transform = visuals.transforms.STTransform(scale=(1, -1, 1), translate=(940, 450, 0.5))
+        self._place_colorbar()
+
+        # ring of frames resident on the GPU, only the image holding the
+        # current frame is visible, see set_frame
+        self.images = [self.image]
+        for i in range(ring_size - 1):
+            image = self.create_image(img_data, cmap)
+            image.attach(self.iso)
+            image.visible = False
+            self.images.append(image)
+        self._ring = OrderedDict()
+        # tile pyramid replacing the ring for large grids, see set_grid_shape
+        self.tiled = None
+
+        # derived layer, e.g. accumulations, drawn above the frames in
+        # physical units, see set_derived
+        self.derived = scene.visuals.Image(np.zeros(img_data.shape, dtype=np.float32),
+                                           method='impostor', cmap=cmap, clim=self.clim,
+                                           texture_format='auto', parent=self.b1.scene)
+        self.derived.transform = visuals.transforms.STTransform(translate=(0, 0, 50))
+        self.derived.visible = False
+        self.derived_clim = self.clim
+
+        # comparison of two frames computed in the shader, above the
+        # derived layer, see set_compare_frame
+        self.compare_filter = CompareFilter()
+        self.compare = scene.visuals.Image(np.zeros((1, 1), dtype=np.float32),
+                                           method='subdivide', clim=(0, 1),
+                                           parent=self.b1.scene)
+        self.compare.transform = visuals.transforms.STTransform(
+            scale=(self.shape[1], self.shape[0], 1), translate=(0, 0, 40))
+        self.compare.attach(self.compare_filter)
+        self.compare.visible = False
+        self.compare_clim = None
+        # frames to compare as (CountsTexture, precision, shape) by name,
+        # 'a' the shown one, 'pinned' and 'linked' its partners
+        self.compare_partner = 'pinned'
+        self._compare_sources = {}
+        # frame 'a' of tiled grids and the pinned one are uploaded into
+        # textures of their own, keys avoid uploading them again
+        self._compare_textures = {'a': CountsTexture(), 'pinned': CountsTexture()}
+        self._compare_keys = {}
+        self._compare_mismatch = False
+
+        # views of other products at the same time, see set_linked_products
+        self.linked = []
+        self._linked_views = []
 
         self.line = None
-        radolan = wrl.georef.get_radolan_grid()
-        self.r0 = radolan[0,0]
+        # geometry and city positions need wradlib/GDAL, they are set up
+        # with the first frame, see set_grid_shape
+        self.grid_geometry = None
+        self.r0 = None
         self.create_cities()
 
-        self.cam = scene.cameras.PanZoomCamera(name="PanZoom", parent=self.b1.scene, rect=(0,0,1000,900), aspect=1)
+        self.cam = scene.cameras.PanZoomCamera(name="PanZoom", parent=self.b1.scene, rect=self._camera_rect(), aspect=1)
         self.b1.camera = self.cam
         self.view = self.b1
+        self.b1.scene.transform.changed.connect(self.on_camera_changed)
 
         self.vline = scene.visuals.Line(parent=self.b1.scene, color="darkgrey")
         self.vline.transform = visuals.transforms.STTransform(translate=(0, 0, -2.5))
@@ -289,7 +477,55 @@ class RadolanCanvas(scene.SceneCanvas):
         self.hline.visible = False
         self.cursor_text.visible = False
 
-        self.measure_fps()
+        # mouse moves are coalesced, the latest position is handled at
+        # most once per frame, see on_mouse_move
+        self._mouse_event_pos = None
+        self._mouse_position = None
+        self._mouse_lonlat = None
+        self._mouse_timer = app.Timer(1. / 60, connect=self._handle_mouse_move)
+        # counts of the shown frame, for the value under the cursor
+        self._counts = None
+        self._nodata = None
+
+        # isolines from rview.contours, in front of the frames
+        self.contours = scene.visuals.Line(parent=self.b1.scene, color='black',
+                                           connect='segments', width=1)
+        self.contours.transform = visuals.transforms.STTransform(translate=(0, 0, -2))
+        self.contours.visible = False
+
+        # rolling per-stage timings, in canvas pixel coordinates
+        self.timing_text = scene.visuals.Text('', parent=self.scene, color='white',
+                                              font_size=8, pos=(10, 10),
+                                              anchor_x='left', anchor_y='top')
+        self.timing_text.visible = False
+        self.timing_timer = app.Timer(1.0, connect=self.update_timing_overlay)
+
+        self.measure_fps(callback=self._fps_measured)
+
+    def on_draw(self, event):
+        with timings.stage('draw'):
+            scene.SceneCanvas.on_draw(self, event)
+
+    def show_timing_overlay(self, show):
+        self.timing_text.visible = show
+        if show:
+            self.timing_timer.start()
+            self.update_timing_overlay()
+        else:
+            self.timing_timer.stop()
+            self.update()
+
+    def update_timing_overlay(self, event=None):
+        self.timing_text.text = timings.format_summary()
+        self.update()
+
+    def _fps_measured(self, fps):
+        self.fps_measured()
+
+    def create_image(self, data, cmap):
+        image = CountsImage(data, cmap=cmap, clim=self.clim, parent=self.b1.scene)
+        image.transform = visuals.transforms.STTransform(translate=(0, 0, 60))
+        return image
 
     def create_cities_flipped(self):
         # initialize citie markers
@@ -302,16 +538,11 @@ class RadolanCanvas(scene.SceneCanvas):
             ccoordList.append(v)
         ccoord = np.vstack(ccoordList)
         ccoord = utils.wgs84_to_radolan(ccoord)
-        radolan = wrl.georef.get_radolan_grid()
-        #print(radolan[...,0].shape)
-        x0 = np.flipud(radolan[...,0])
-        y0 = np.flipud(radolan[...,1])
-        #print()
-        r0 = radolan[0,0]
+        r0 = self.r0
         #print(r0)
         pos_scene = np.zeros((ccoord.shape[0], 2), dtype=np.float32)
         #print(pos_scene.shape)
-        pos_scene[:,1] = 900 - (ccoord[:,1] - r0[1])
+        pos_scene[:,1] = self.shape[0] - (ccoord[:,1] - r0[1])
         pos_scene[:,0] = (ccoord[:,0] - r0[0])
         #print(pos_scene)
         self.markers.set_data(pos=pos_scene, symbol="s", edge_color="blue",
@@ -329,19 +560,34 @@ class RadolanCanvas(scene.SceneCanvas):
         for k, v in cities.items():
             cnameList.append(k)
             ccoordList.append(v)
-        ccoord = np.vstack(ccoordList)
-        ccoord = utils.wgs84_to_radolan(ccoord)
-        radolan = wrl.georef.get_radolan_grid()
-        #r0 = radolan[0,0]
-        pos_scene = np.zeros((ccoord.shape[0], 2), dtype=np.float32)
-        pos_scene[:] = ccoord - self.r0
+        self.cities_lonlat = np.vstack(ccoordList)
+        self.cities_xy = None
+        self.text = scene.visuals.Text(text=cnameList, pos=np.zeros((len(cnameList), 2)),
+                                       font_size=20, anchor_x = 'right', anchor_y = 'top',
+                                       parent=self.b1.scene)
+        self.markers.visible = False
+        self.text.visible = False
+
+    def update_cities(self):
+        if self.cities_xy is None:
+            self.cities_xy = utils.wgs84_to_radolan(self.cities_lonlat)
+        # markers are placed relative to the origin of the grid
+        pos_scene = np.zeros((self.cities_xy.shape[0], 2), dtype=np.float32)
+        pos_scene[:] = self.cities_xy - self.r0
         self.markers.set_data(pos=pos_scene, symbol="disc", edge_color="blue",
                               size=10)
-        self.text = scene.visuals.Text(text=cnameList, pos=pos_scene, font_size=20,
-                                       anchor_x = 'right', anchor_y = 'top', parent=self.b1.scene)
+        self.text.pos = pos_scene
+        self.markers.visible = True
+        self.text.visible = True
 
     def set_colormap(self, cmap):
-        self.image.cmap = cmap
+        for image in self.images:
+            image.cmap = cmap
+        for linked in self._linked_views:
+            linked.image.cmap = cmap
+        if self.tiled is not None:
+            self.tiled.cmap = cmap
+        self.derived.cmap = cmap
         self.cbar.cmap = cmap
         #zhcmap = ['#ffffff','#092faa','#174ef8','#27b4f3','#35edee','#33f64b','#25ca39',
         #  '#17a029','#057217','#fef858','#fece4b','#fda540','#fc7a36','#fd2e2e',
@@ -363,6 +609,295 @@ class RadolanCanvas(scene.SceneCanvas):
         #self.iso.cmap = cm2
         self.iso.cmap = cmap
 
+    def set_frame(self, counts, metadata, key=None):
+        """Show integer ``counts``, physical values are
+        ``counts * metadata['precision']``.
+
+        Frames with a ``key`` stay resident in the ring of images, showing
+        the same key again only switches the visible image, no upload.
+        Pixels holding the count ``metadata['nodata']`` are not drawn.
+        """
+        shape = (metadata.get('nrow', counts.shape[0]),
+                 metadata.get('ncol', counts.shape[1]))
+        if shape != self.shape or self.grid_geometry is None:
+            self.set_grid_shape(shape)
+        precision = metadata.get('precision', 1.)
+        if precision != self.precision:
+            self.precision = precision
+            self.clear_ring()
+            self.set_clim(self.clim)
+        self._counts = counts
+        self._nodata = nodata = metadata.get('nodata')
+        if self.cursor_text.visible and self._mouse_position is not None:
+            self.update_cursor_text()
+        if self.tiled is not None:
+            # large grids are not kept in the ring, see set_grid_shape
+            self.tiled.set_data(counts, nodata)
+            return
+        if key is None:
+            for k, image in list(self._ring.items()):
+                if image is self.image:
+                    del self._ring[k]
+            with timings.stage('set_data'):
+                self.image.set_data(counts, nodata)
+            return
+        image = self._ring.pop(key, None)
+        if image is None:
+            free = [im for im in self.images if im not in self._ring.values()]
+            if free:
+                image = free[0]
+            else:
+                # the least recently shown frame leaves the ring
+                image = self._ring.popitem(last=False)[1]
+            with timings.stage('set_data'):
+                image.set_data(counts, nodata)
+        self._ring[key] = image
+        if image is not self.image:
+            image.visible = self.image.visible
+            self.image.visible = False
+            self.image = image
+
+    def set_contours(self, vertices):
+        """Show contour segments as returned from
+        :func:`rview.contours.contour_segments`, None hides them."""
+        if vertices is None or not len(vertices):
+            self.contours.visible = False
+        else:
+            with timings.stage('contours_upload'):
+                self.contours.set_data(pos=vertices, connect='segments')
+            self.contours.visible = True
+        self.update()
+
+    def in_ring(self, key):
+        return key in self._ring and self.tiled is None
+
+    def clear_ring(self):
+        self._ring.clear()
+        # keys of another source may name other frames
+        self._compare_keys.clear()
+
+    def set_clim(self, clim):
+        """Set color limits in physical units."""
+        self.clim = clim
+        for image in self.images:
+            image.clim = (clim[0] / self.precision, clim[1] / self.precision)
+        if self.tiled is not None:
+            self.tiled.clim = (clim[0] / self.precision, clim[1] / self.precision)
+        for linked in self.linked:
+            linked.image.clim = (clim[0] / linked.precision, clim[1] / linked.precision)
+        if not (self.derived.visible or self.compare.visible):
+            self.cbar.clim = clim
+        self._update_compare_clim()
+
+    def set_linked_products(self, products):
+        """Show a view for each of ``products`` right of the main view.
+
+        The views pan and zoom with the main view, their frames are set
+        with set_linked_frames.
+        """
+        for linked in self.linked:
+            self.grid.remove_widget(linked.view)
+        while len(self._linked_views) < len(products):
+            view = scene.widgets.ViewBox(border_color=self.b1.border_color)
+            view.camera = scene.PanZoomCamera(rect=self.cam.rect, aspect=1)
+            self.cam.link(view.camera)
+            image = CountsImage(cmap=self.images[0].cmap, parent=view.scene)
+            image.transform = visuals.transforms.STTransform(translate=(0, 0, 60))
+            label = scene.visuals.Text('', parent=view, color='white', font_size=10,
+                                       pos=(10, 10), anchor_x='left', anchor_y='top')
+            self._linked_views.append(LinkedView(view, image, label))
+        self.linked = self._linked_views[:len(products)]
+        for col, (linked, product) in enumerate(zip(self.linked, products), 1):
+            self.grid.add_widget(linked.view, row=0, col=col)
+            linked.label.text = product
+            linked.image.visible = False
+        self.update()
+
+    def set_linked_frames(self, frames):
+        """Show ``(counts, metadata)`` frames in the linked views, None
+        where a product has no frame at this time."""
+        for linked, frame in zip(self.linked, frames):
+            if frame is None:
+                linked.image.visible = False
+                continue
+            counts, metadata = frame
+            shape = (metadata.get('nrow', counts.shape[0]),
+                     metadata.get('ncol', counts.shape[1]))
+            # e.g. the extended grid of EX, placed at its own origin
+            offset = (0, 0) if shape == self.shape else \
+                get_grid(*shape).origin - self.r0
+            # large grids are shown decimated, like the derived layer
+            step = int(np.ceil(max(shape) / float(self.tile_threshold)))
+            with timings.stage('set_data'):
+                linked.image.set_data(counts[::step, ::step], metadata.get('nodata'))
+            linked.image.transform.scale = (step, step, 1)
+            linked.image.transform.translate = (offset[0], offset[1], 60)
+            linked.precision = metadata.get('precision', 1.)
+            linked.shape = shape
+            linked.image.clim = (self.clim[0] / linked.precision,
+                                 self.clim[1] / linked.precision)
+            linked.image.visible = True
+        # the first linked view is the side by side partner to compare
+        first = self.linked[0] if self.linked else None
+        if first is not None and first.image.visible:
+            self._compare_sources['linked'] = (first.image.counts,
+                                               first.precision, first.shape)
+        else:
+            self._compare_sources.pop('linked', None)
+
+    def set_derived(self, data, clim=None):
+        """Set ``data`` in physical units as derived layer, it is shown
+        with show_derived. ``clim`` defaults to the range of finite values.
+        """
+        data = np.asarray(data, dtype=np.float32)
+        if clim is None:
+            finite = data[np.isfinite(data)]
+            top = float(finite.max()) if finite.size else 1.
+            clim = (0, top if top > 0 else 1.)
+        # large grids are shown decimated, one texture has to hold them
+        step = int(np.ceil(max(data.shape) / float(self.tile_threshold)))
+        with timings.stage('set_data'):
+            self.derived.set_data(np.nan_to_num(data[::step, ::step]))
+        self.derived.transform.scale = (step, step, 1)
+        self.derived.clim = clim
+        self.derived_clim = clim
+        if self.derived.visible:
+            self.cbar.clim = clim
+            self.update()
+
+    def show_derived(self, show):
+        self.derived.visible = show
+        if not self.compare.visible:
+            self.cbar.clim = self.derived_clim if show else self.clim
+        self.update()
+
+    def set_compare_frame(self, which, counts, metadata, key=None):
+        """Set frame 'a', the shown one, or the 'pinned' partner of the
+        comparison.
+
+        Frame 'a' is the texture of the shown image in the ring, only for
+        tiled grids it costs an upload. The pinned frame is uploaded once
+        into a texture of its own, none of them is uploaded again if
+        ``key`` is the one already set.
+        """
+        shape = (metadata.get('nrow', counts.shape[0]),
+                 metadata.get('ncol', counts.shape[1]))
+        precision = metadata.get('precision', 1.)
+        if which == 'a' and self.tiled is None:
+            self._compare_sources['a'] = (self.image.counts, precision, shape)
+            return
+        texture = self._compare_textures[which]
+        if key is None or self._compare_keys.get(which) != key:
+            # large grids are compared decimated, like the derived layer
+            step = int(np.ceil(max(counts.shape) / float(self.tile_threshold)))
+            with timings.stage('set_data'):
+                texture.set_data(counts[::step, ::step], metadata.get('nodata'))
+            self._compare_keys[which] = key
+        self._compare_sources[which] = (texture, precision, shape)
+
+    def set_compare_mode(self, mode, threshold=0., clim=None, partner=None):
+        """Compare frame 'a' to its ``partner`` 'pinned' or 'linked' (the
+        first linked view) by ``mode`` 'difference', 'ratio' or 'change',
+        the difference where it is at least ``threshold``. None switches
+        the comparison off, else show it with show_compare. ``clim``
+        defaults to limits symmetric around no change, as wide as the
+        color limits of the frames.
+        """
+        if mode is None:
+            self.show_compare(False)
+            return
+        self.compare_filter.mode = mode
+        self.compare_filter.threshold = threshold
+        if partner is not None:
+            self.compare_partner = partner
+        self.compare_clim = clim
+        self._update_compare_clim()
+
+    def show_compare(self, show):
+        a = self._compare_sources.get('a')
+        b = self._compare_sources.get(self.compare_partner)
+        if show and (a is None or b is None):
+            show = False
+        mismatch = show and a[2] != b[2]
+        if mismatch and not self._compare_mismatch:
+            self.message(text="Frames of different grids cannot be compared")
+        self._compare_mismatch = mismatch
+        show = show and not mismatch
+        if show:
+            # binding textures uploads nothing
+            self.compare_filter.bind('a', a[0], a[1])
+            self.compare_filter.bind('b', b[0], b[1])
+            self.compare_filter.transform = self.compare.get_transform('framebuffer', 'visual')
+            self.cbar.cmap = self.compare_filter.cmap
+            self.cbar.clim = self.compare_filter.clim
+        elif self.compare.visible:
+            self.cbar.cmap = self.images[0].cmap
+            self.cbar.clim = self.derived_clim if self.derived.visible else self.clim
+        self.compare.visible = show
+        self.update()
+
+    def _update_compare_clim(self):
+        clim = self.compare_clim
+        if clim is None and self.compare_filter.mode == 'ratio':
+            clim = (0., 2.)
+        elif clim is None:
+            half = (self.clim[1] - self.clim[0]) / 2. or 1.
+            clim = (-half, half)
+        self.compare_filter.clim = clim
+        if self.compare.visible:
+            self.cbar.clim = clim
+
+    def _camera_rect(self):
+        # room for the colorbar right of the grid
+        nrows, ncols = self.shape
+        return (0, 0, ncols + 100 * nrows / 900., nrows)
+
+    def _place_colorbar(self):
+        # layout of the 900 x 900 grid, scaled with the number of rows
+        nrows, ncols = self.shape
+        f = nrows / 900.
+        self.cbar.transform = visuals.transforms.STTransform(
+            scale=(f, -f, 1), translate=(ncols + 40 * f, 450 * f, 0.5))
+
+    def set_grid_shape(self, shape):
+        """Adapt the canvas to a grid of ``shape`` (nrows, ncols).
+
+        Grids larger than ``tile_threshold`` are shown with a TiledImage,
+        which uploads only the tiles and level the camera shows.
+        """
+        self.shape = tuple(shape)
+        self.clear_ring()
+        self.grid_geometry = get_grid(*self.shape)
+        self.r0 = self.grid_geometry.origin
+        self.update_cities()
+        self._place_colorbar()
+        self.derived.set_data(np.zeros((1, 1), dtype=np.float32))
+        self.derived.visible = False
+        self.compare.transform.scale = (self.shape[1], self.shape[0], 1)
+        tiled = max(self.shape) > self.tile_threshold
+        if tiled and self.tiled is None:
+            self.tiled = TiledImage(cmap=self.images[0].cmap,
+                                    clim=self.images[0].clim,
+                                    parent=self.b1.scene)
+            self.tiled.attach(self.iso)
+            for image in self.images:
+                image.parent = None
+        elif not tiled and self.tiled is not None:
+            self.tiled.parent = None
+            self.tiled = None
+            for image in self.images:
+                image.parent = self.b1.scene
+        self.cam.rect = self._camera_rect()
+        self.on_camera_changed()
+
+    def on_camera_changed(self, event=None):
+        if self.compare.visible:
+            self.compare_filter.transform = self.compare.get_transform('framebuffer', 'visual')
+        if self.tiled is not None:
+            rect = self.cam.rect
+            self.tiled.update_view((rect.left, rect.bottom, rect.width,
+                                    rect.height), self.b1.size)
+
     def set_data(self, n_levels, cmap):
         #self.iso.set_color(cmap)
         #cl = np.linspace(-self.radius, self.radius, n_levels + 2)[1:-1]
@@ -374,24 +909,73 @@ class RadolanCanvas(scene.SceneCanvas):
         print('%s - pos: %r, button: %s,  delta: %r' %
               (what, event.pos, event.button, event.delta))
 
+    def on_mouse_press(self, event):
+        self._press_position = event.pos
+
+    def on_mouse_release(self, event):
+        # a click is a press and release without panning in between
+        press = getattr(self, '_press_position', None)
+        self._press_position = None
+        if press is None or event.button != 1:
+            return
+        if np.hypot(*(np.asarray(event.pos) - press)) > 3:
+            return
+        self._click_position = self.scene.node_transform(self.b1.scene).map(event.pos)[:2]
+        self.mouse_clicked()
+
     def on_mouse_move(self, event):
-        #pass
-        point = self.scene.node_transform(self.image).map(event.pos)[:2]
-        #point[1] = 900 - point[1]
-        self._mouse_position = point
+        # high rate mice send far more events than frames are drawn,
+        # keep the latest position for the timer
+        self._mouse_event_pos = event.pos
+        self._mouse_timer.start()
+
+    def _handle_mouse_move(self, event=None):
+        self._mouse_timer.stop()
+        with timings.stage('mouse'):
+            point = self.scene.node_transform(self.b1.scene).map(self._mouse_event_pos)[:2]
+            self._mouse_position = point
+            # projected once, shared with the properties readout
+            if self.grid_geometry is None:
+                self._mouse_lonlat = None
+            else:
+                self._mouse_lonlat = self.grid_geometry.pixel_to_lonlat(point)
+            self.update_cursor(point)
         self.mouse_moved()
-        self.update_cursor(point)
-        #self.update_cursor(event.pos)
 
-    def update_cursor(self, pos):
+    def cursor_value(self, pos=None):
+        """Physical value of the shown frame at ``pos`` (default the
+        mouse position), NaN for nodata and None outside the grid."""
+        if pos is None:
+            pos = self._mouse_position
+        if pos is None or self._counts is None:
+            return None
+        col, row = int(np.floor(pos[0])), int(np.floor(pos[1]))
+        nrows, ncols = self._counts.shape
+        if not (0 <= row < nrows and 0 <= col < ncols):
+            return None
+        count = self._counts[row, col]
+        if count == self._nodata:
+            return np.nan
+        return float(count) * self.precision
+
+    def update_cursor_text(self):
+        pos = self._mouse_position
+        text = []
+        if self._mouse_lonlat is not None:
+            text.append('({0:3.3f}, {1:3.3f})'.format(*self._mouse_lonlat[:2]))
+        value = self.cursor_value(pos)
+        if value is not None:
+            text.append('nodata' if np.isnan(value) else '{0:g}'.format(value))
+        self.cursor_text.text = ' '.join(text)
+        self.cursor_text.pos = pos + (0, 0)
 
-        if self.hline.visible and self.vline.visible:
-            ll = utils.radolan_to_wgs84(pos + self.r0)
-            self.cursor_text.text = '({0:3.3f}, {1:3.3f})'.format(ll[0], ll[1])
-            self.cursor_text.pos = pos + (0, 0)
-
-        self.vline.set_data(np.array([[pos[0], 0], [pos[0], 899]]))
-        self.hline.set_data(np.array([[0, pos[1]], [899, pos[1]]]))
+    def update_cursor(self, pos):
+        if not (self.hline.visible and self.vline.visible):
+            return
+        self.update_cursor_text()
+        nrows, ncols = self.shape
+        self.vline.set_data(np.array([[pos[0], 0], [pos[0], nrows - 1]]))
+        self.hline.set_data(np.array([[0, pos[1]], [ncols - 1, pos[1]]]))
 
 
 
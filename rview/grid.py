@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+RADOLAN grid geometry
+
+One shared object per grid shape, which lazily builds the polar
+stereographic grid and the per-pixel lon/lat table. Both can be kept as
+memory-mapped ``.npy`` files in a cache directory, so later processes
+only map them instead of recomputing.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from rview import utils
+
+
+def default_cachedir():
+    return os.environ.get('RVIEW_CACHE',
+                          os.path.join(os.path.expanduser('~'),
+                                       '.cache', 'rview'))
+
+
+class RadolanGrid(object):
+    """
+    Geometry of a RADOLAN grid with ``nrows`` x ``ncols`` pixels.
+
+    ``xy`` and ``lonlat`` are ``(nrows, ncols, 2)`` arrays indexed
+    ``[row, col]``, ``origin`` is the stereographic coordinate of pixel
+    ``(0, 0)``. Set ``cachedir`` to None to keep everything in memory.
+    """
+    def __init__(self, nrows=900, ncols=900, cachedir=''):
+        self.shape = (nrows, ncols)
+        if cachedir == '':
+            cachedir = default_cachedir()
+        self.cachedir = cachedir
+        self._xy = None
+        self._lonlat = None
+
+    @property
+    def xy(self):
+        if self._xy is None:
+            self._xy = self._load('xy', wgs84=False)
+        return self._xy
+
+    @property
+    def lonlat(self):
+        if self._lonlat is None:
+            self._lonlat = self._load('lonlat', wgs84=True)
+        return self._lonlat
+
+    @property
+    def origin(self):
+        return np.array(self.xy[0, 0])
+
+    def pixel_to_xy(self, pos):
+        return np.asarray(pos) + self.origin
+
+    def pixel_to_lonlat(self, pos):
+        """Return lon/lat for pixel positions of shape ``(..., 2)``.
+
+        Positions inside the grid are looked up in the ``lonlat`` table,
+        positions outside are reprojected.
+        """
+        pos = np.asarray(pos, dtype=np.float64)
+        col = np.floor(pos[..., 0]).astype(np.intp)
+        row = np.floor(pos[..., 1]).astype(np.intp)
+        inside = ((row >= 0) & (row < self.shape[0]) &
+                  (col >= 0) & (col < self.shape[1]))
+        if np.all(inside):
+            return np.array(self.lonlat[row, col])
+        ll = utils.radolan_to_wgs84(self.pixel_to_xy(pos))
+        if np.any(inside):
+            ll[inside] = self.lonlat[row[inside], col[inside]]
+        return ll
+
+    def _load(self, name, wgs84):
+        if self.cachedir is None:
+            return self._compute(wgs84)
+        fname = os.path.join(self.cachedir, 'radolan_{0}_{1}x{2}.npy'.format(
+            name, *self.shape))
+        if not os.path.exists(fname):
+            arr = self._compute(wgs84)
+            try:
+                if not os.path.isdir(self.cachedir):
+                    os.makedirs(self.cachedir)
+                # write to a temporary file first, so concurrent
+                # viewers never map a half written table
+                fd, tmp = tempfile.mkstemp(suffix='.npy', dir=self.cachedir)
+                with os.fdopen(fd, 'wb') as fh:
+                    np.save(fh, arr)
+                os.rename(tmp, fname)
+            except (IOError, OSError):
+                return arr
+        return np.load(fname, mmap_mode='r')
+
+    def _compute(self, wgs84):
+        import wradlib as wrl
+        return wrl.georef.get_radolan_grid(self.shape[0], self.shape[1],
+                                           wgs84=wgs84)
+
+
+_grids = {}
+
+
+def get_grid(nrows=900, ncols=900):
+    """Return the process-wide :class:`RadolanGrid` for this shape."""
+    grid = _grids.get((nrows, ncols))
+    if grid is None:
+        grid = _grids[(nrows, ncols)] = RadolanGrid(nrows, ncols)
+    return grid
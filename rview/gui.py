@@ -5,32 +5,67 @@
 # -----------------------------------------------------------------------------
 #!/usr/bin/env python
 
+import os
+import sys
 import glob
 import time
+import functools
 import numpy as np
 import datetime as dt
 #import matplotlib
 #matplotlib.use('Qt4Agg')
 
+from concurrent.futures import ThreadPoolExecutor
+
+# first, so the startup report counts the GUI imports
+from rview.profiling import startup
+
 from PyQt4 import QtGui, QtCore
 
 # other pentecost_qt imports
 from rview.glcanvas import RadolanCanvas
 from rview.properties import PropertiesWidget
-from rview import utils
-
+from rview.loader import FrameLoader, LinkedReader
+from rview.playback import PlaybackScheduler
+from rview.profiling import timings, Profile
+from rview.accumulate import accumulate, SlidingAccumulator
+from rview.contours import ContourWorker
+from rview.stack import PixelStack
+from rview.store import FrameStore
+from rview.bulk import BulkFrames, create_pool
 
 class MainWindow(QtGui.QMainWindow):
 
-    def __init__(self, parent=None):
+    signal_accumulated = QtCore.pyqtSignal(object, name='accumulated')
+    signal_sliding_ready = QtCore.pyqtSignal(object, name='sliding_ready')
+    signal_series_ready = QtCore.pyqtSignal(object, name='series_ready')
+    signal_series_progress = QtCore.pyqtSignal(int, int, name='series_progress')
+    signal_bulk_progress = QtCore.pyqtSignal(int, int, int, int, name='bulk_progress')
+    signal_first_frame = QtCore.pyqtSignal(name='first_frame')
+
+    def __init__(self, dirname=None, parent=None):
+        """Only builds the widgets, the directory is scanned and the
+        first frame decoded in the background once the window is up."""
         super(MainWindow, self).__init__(parent)
 
         self.resize(600, 500)
         self.setWindowTitle('RADOLAN Viewer')
         self._need_canvas_refresh = False
 
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(self.reload)
+        self.loader = FrameLoader()
+        # every decoded frame stays in RAM, compressed
+        self.store = FrameStore()
+        self.loader.signal_frame_ready.connect(self.frame_ready)
+        self.loader.signal_frame_failed.connect(self.frame_failed)
+
+        self.scheduler = PlaybackScheduler(self.loader.ready,
+                                           self.loader.decode_rate)
+        self.scheduler.signal_advance.connect(self.advance)
+        self.scheduler.signal_request.connect(self.request_frame)
+        self.scheduler.signal_decode_rate.connect(self.adapt_prefetch)
+        self._direction = 1
+        self._lastFrame = 0
+        self._advancing = False
 
         splitter = QtGui.QSplitter(QtCore.Qt.Horizontal)
 
@@ -38,8 +73,11 @@ class MainWindow(QtGui.QMainWindow):
         self.canvas.create_native()
         self.canvas.native.setParent(self)
         self.canvas.mouse_moved.connect(self.mouse_moved)
+        self.canvas.mouse_clicked.connect(self.mouse_clicked)
+        self.canvas.fps_measured.connect(self.fps_measured)
+        self.canvas.message.connect(self.canvas_message)
 
-        self.props = PropertiesWidget()
+        self.props = PropertiesWidget(dirname)
         splitter.addWidget(self.props)
         splitter.addWidget(self.canvas.native)
 
@@ -49,9 +87,47 @@ class MainWindow(QtGui.QMainWindow):
         self.props.signal_playpause_changed.connect(self.start_stop)
         self.props.signal_speed_changed.connect(self.speed)
         self.props.signal_toggle_Cursor.connect(self.toggle_Cursor)
+        self.scheduler.signal_stats.connect(self.props.show_playback_stats)
         self.props.signal_data_changed.connect(self.data_changed)
+        self.props.signal_dir_changed.connect(self.dir_changed)
+        self.props.signal_frames_appended.connect(self.frames_appended)
+        self.props.signal_timing_changed.connect(self.timing_changed)
+        self.props.signal_export_trace.connect(self.export_trace)
+        self.props.signal_accumulate.connect(self.accumulate)
+        self.props.signal_derived_changed.connect(self.derived_changed)
+        self.signal_accumulated.connect(self.show_accumulation)
+        self.signal_sliding_ready.connect(self.show_sliding)
+        # range accumulations run here, they fan out over processes
+        self._acc_pool = ThreadPoolExecutor(max_workers=1)
+        # the sliding accumulation advances here in order, not queued
+        # behind a long range accumulation
+        self._sliding_pool = ThreadPoolExecutor(max_workers=1)
+        self.sliding = None
+        self._slidingFrame = None
+        self.contour_worker = ContourWorker()
+        self.contour_worker.signal_contours_ready.connect(self.contours_ready)
+        self.props.signal_contours_changed.connect(self.update_contours)
+        self._contourKey = None
+        # pixel time series are read from a stack built on first use
+        self._series_pool = ThreadPoolExecutor(max_workers=1)
+        self.stack = None
+        self.signal_series_ready.connect(self.show_series)
+        self.signal_series_progress.connect(self.props.show_series_progress)
+        # optional decode of all frames into shared memory
+        self.bulk = None
+        self._bulk_pool = None
+        self._bulk_thread = ThreadPoolExecutor(max_workers=1)
+        self.props.signal_bulk_load.connect(self.bulk_load)
+        # products shown side by side decode in parallel to the main one
+        self._linked_pool = ThreadPoolExecutor(max_workers=4)
+        self.props.signal_linked_changed.connect(self.dir_changed)
+        self.props.signal_compare_changed.connect(self.compare_changed)
+        self.props.signal_pin_partner.connect(self.pin_partner)
+        self.props.signal_source_closing.connect(self.source_closing)
+        self.signal_bulk_progress.connect(self.bulk_progress)
+        self.profile = Profile()
+        self.loader.reader = self.frame_reader()
         self.update_view()
-        self.slider_changed()
         self._need_recompute = False
 
     def toggle_Cursor(self):
@@ -59,43 +135,337 @@ class MainWindow(QtGui.QMainWindow):
         self.canvas.hline.visible = isCheck
         self.canvas.vline.visible = isCheck
         self.canvas.cursor_text.visible = isCheck
+        if isCheck and self.canvas._mouse_position is not None:
+            self.canvas.update_cursor(self.canvas._mouse_position)
         self.update_canvas()
 
     def data_changed(self):
-        self.canvas.image.clim = 'auto'
-        self.canvas.image.update()
+        self.canvas.set_clim(self.props.data0ranges[0])
 
         self.update_canvas()
         #self.canvas.cbar.clim = (0, 100)
 
+    def dir_changed(self):
+        self.scheduler.frames = self.props.frames
+        self.canvas.clear_ring()
+        self.canvas.set_linked_products(self.props.linked_products())
+        self.loader.reader = self.frame_reader()
+        self.loader.set_filelist(self.props.filelist)
+        self._lastFrame = self.props.actualFrame
+        # a running sliding accumulation refills from the new frames
+        self.sliding = None
+        self._slidingFrame = None
+        # cube frames are keyed by index, which is ambiguous across sources
+        self.contour_worker.clear()
+        self.slider_changed()
+
+    def source_closing(self):
+        """Drop the queued reads of a source about to be closed, running
+        ones finish or fail on the closed source."""
+        self.loader.set_filelist([])
+
+    def frame_reader(self):
+        """Reader of the actual source going through the frame store,
+        also decoding the frames of the linked products."""
+        reader = self._source_reader()
+        linked = self.props.linked_files()
+        if linked:
+            reader = LinkedReader(reader, linked, self._linked_pool)
+        return reader
+
+    def _source_reader(self):
+        reader = self.props.reader
+        if self.bulk is not None:
+            if self.bulk.filelist == self.props.filelist:
+                return self.bulk.wrap(self._store_reader(reader))
+            self.bulk.close()
+            self.bulk = None
+        return self._store_reader(reader)
+
+    def _store_reader(self, reader):
+        if self.props.cube is not None:
+            # cube frames are indices, key them on the cube file
+            read = self.store.wrap(lambda key: reader(key[1]))
+            cube = self.props.cube.filename
+            return lambda index: read((cube, index))
+        # the store replaces the uncompressed frame cache
+        return self.store.wrap(functools.partial(reader, cache=False))
+
+    def bulk_load(self):
+        """Decode all frames of the directory on a process pool into
+        shared memory, frames are shown from there once they arrived."""
+        if self.props.cube is not None or not self.props.frames:
+            print("Bulk decoding needs a directory of RADOLAN files")
+            return
+        if self.bulk is not None:
+            self.bulk.close()
+        if self._bulk_pool is None:
+            # kept for later loads, spawning workers takes a while
+            self._bulk_pool = create_pool()
+        self.bulk = BulkFrames(self.props.filelist)
+        self.loader.reader = self.frame_reader()
+        self.props.show_bulk_progress(1, self.props.frames)
+        self.props.bulkButton.setEnabled(False)
+        future = self._bulk_thread.submit(self.bulk.load, self._bulk_pool,
+                                          progress=self.signal_bulk_progress.emit)
+        future.add_done_callback(self._bulk_done)
+
+    def _bulk_done(self, future):
+        if future.exception() is not None:
+            print("Bulk decoding failed:", future.exception())
+        # re-enable from the GUI thread
+        QtCore.QTimer.singleShot(0, lambda: self.props.bulkButton.setEnabled(True))
+
+    def bulk_progress(self, done, total, start, stop):
+        self.props.show_bulk_progress(done, total)
+        frame = self.props.actualFrame
+        if start <= frame < stop and not self.loader.ready(frame):
+            self.update_canvas()
+
+    def frames_appended(self):
+        self.loader.extend(self.props.filelist)
+        if isinstance(self.loader.reader, LinkedReader):
+            self.loader.reader.linked = self.props.linked_files()
+        self.scheduler.frames = self.props.frames
+        if not self.props.autoCheckBox.isChecked():
+            # decode the newest frame, so jumping there is instant
+            self.loader.prefetch([self.props.frames - 1])
+
     def update_view(self):
         print("CMAP:", self.props.combo.currentText())
         self.canvas.set_colormap(self.props.combo.currentText())
         self.canvas.update()
 
-    def reload(self):
+    def advance(self, index):
         if self._need_canvas_refresh:
             self._need_canvas_refresh = False
             self.redraw_canvas()
-        if self.props.slider.value() == self.props.slider.maximum():
-            self.props.slider.setValue(1)
-        else:
-            self.props.slider.setValue(self.props.slider.value() + 1)
+        self._advancing = True
+        self.props.slider.setValue(index + 1)
+        self._advancing = False
+
+    def request_frame(self, index):
+        self.loader.request(index, self._direction)
+
+    def adapt_prefetch(self, rate):
+        # decode far enough ahead to cover twice the decoding latency
+        depth = int(np.ceil(2. * self.scheduler.fps / rate)) + 1
+        self.loader.depth = min(max(depth, 4), 64)
 
     def start_stop(self):
-        if self.timer.isActive():
-            self.timer.stop()
+        if self.scheduler.isActive():
+            self.scheduler.stop()
+            if self.profile.active:
+                fname = self.profile.stop(os.path.abspath('rview-playback.prof'))
+                print("Playback profile written to", fname)
         else:
-            self.timer.start()
+            if self.props.profileCheckBox.isChecked():
+                self.profile.start()
+            self._direction = 1
+            self.scheduler.start(self.props.actualFrame, self.props.frames)
+
+    def timing_changed(self):
+        enabled = self.props.timingCheckBox.isChecked()
+        timings.enabled = enabled
+        self.canvas.show_timing_overlay(enabled)
+
+    def export_trace(self, fname):
+        count = timings.export_chrome_trace(fname)
+        print("Exported {0} trace events to {1}".format(count, fname))
+
+    def _acc_thresholds(self):
+        return (self.props.accThreshold.value(),)
+
+    def accumulate(self):
+        if self.props.index is None or not self.props.frames:
+            print("Accumulation needs a directory of RADOLAN files")
+            return
+        start, stop = self.props.accumulation_range()
+        files = self.props.filelist[start:stop]
+        self.props.accButton.setEnabled(False)
+        future = self._acc_pool.submit(accumulate, files,
+                                       self._acc_thresholds())
+        # emitted from the worker thread, delivered in the GUI thread
+        future.add_done_callback(
+            lambda f: self.signal_accumulated.emit(f))
+
+    def show_accumulation(self, future):
+        self.props.accButton.setEnabled(True)
+        try:
+            acc = future.result()
+        except Exception as err:
+            print("Accumulation failed:", err)
+            return
+        self.props.slidingCheckBox.setChecked(False)
+        self.show_derived(acc.result, "{0} frames".format(acc.frames))
+        self.props.derivedCheckBox.setChecked(True)
+        self.canvas.show_derived(True)
+
+    def show_derived(self, result, text=''):
+        self.set_derived(derived_data(result, self.props.accumulation_stat()), text)
+
+    def set_derived(self, data, text=''):
+        self.canvas.set_derived(data)
+        self.props.accLabel.setText("Accumulation {0}".format(text).strip())
+
+    def derived_changed(self):
+        if not self.props.slidingCheckBox.isChecked():
+            self.sliding = None
+            self._slidingFrame = None
+        elif self.props.cube is not None:
+            self.show_message("Sliding accumulation needs a directory of "
+                              "RADOLAN files")
+            self.props.slidingCheckBox.setChecked(False)
+        elif (self.props.index is not None and self.props.frames and
+              getattr(self, 'data', None) is not None):
+            # e.g. another statistic of the same window
+            self.update_sliding(refresh=True)
+        self.canvas.show_derived(self.props.derivedCheckBox.isChecked())
+
+    def update_sliding(self, refresh=False):
+        """Advance the sliding accumulation to the actual frame on the
+        accumulation thread, shown with show_sliding.
+
+        Stepping forward by one frame adds the shown frame and drops the
+        expired one, any other jump refills the window with the frames of
+        the frame store.
+        """
+        frame = self.props.actualFrame
+        if frame == self._slidingFrame and not refresh:
+            return
+        window = self.props.accumulation_window()
+        # linked products are not accumulated
+        metadata = dict((k, v) for k, v in self.metadata.items() if k != 'linked')
+        todo = []
+        if (self.sliding is None or self.sliding.window != window or
+                self._slidingFrame not in (frame, frame - 1)):
+            self.sliding = SlidingAccumulator(window, self.data.shape,
+                                              self._acc_thresholds())
+            todo = self.props.filelist[max(frame - window + 1, 0):frame]
+            todo.append((self.data, metadata))
+        elif self._slidingFrame == frame - 1:
+            todo.append((self.data, metadata))
+        self._slidingFrame = frame
+        reader = self.loader.reader
+        if isinstance(reader, LinkedReader):
+            reader = reader.reader
+        future = self._sliding_pool.submit(advance_sliding, self.sliding, todo,
+                                           reader, self.props.accumulation_stat())
+        future.frame = frame
+        # emitted from the worker thread, delivered in the GUI thread
+        future.add_done_callback(lambda f: self.signal_sliding_ready.emit(f))
+
+    def show_sliding(self, future):
+        if future.frame != self._slidingFrame or self.sliding is None:
+            # a newer step is on its way
+            return
+        try:
+            data, frames = future.result()
+        except Exception as err:
+            self.show_message("Sliding accumulation failed: {0}".format(err))
+            self.sliding = None
+            self._slidingFrame = None
+            return
+        self.set_derived(data, "{0} frames".format(frames))
+
+    def update_contours(self):
+        """Show the contours of the actual frame, from the cache or
+        once the worker extracted them."""
+        levels = self.props.contour_levels()
+        if not levels or getattr(self, 'data', None) is None:
+            self._contourKey = None
+            self.canvas.set_contours(None)
+            return
+        key = self.props.filelist[self.props.actualFrame]
+        precision = self.metadata.get('precision', 1.)
+        self._contourKey = self.contour_worker.make_key(key, levels, precision)
+        vertices = self.contour_worker.request(key, self.data, precision, levels,
+                                               self.metadata.get('nodata'))
+        if vertices is not None:
+            self.canvas.set_contours(vertices)
+
+    def contours_ready(self, ckey):
+        if ckey == self._contourKey:
+            self.canvas.set_contours(self.contour_worker.get(ckey))
+
+    def compare_changed(self):
+        mode = self.props.compare_mode()
+        partner = 'linked' if self.props.partner_linked() else 'pinned'
+        self.canvas.set_compare_mode(mode, self.props.changeThreshold.value(),
+                                     partner=partner)
+        if mode is not None and getattr(self, 'data', None) is not None:
+            self.update_compare(self.props.filelist[self.props.actualFrame])
+
+    def pin_partner(self):
+        """Compare to the actual frame from now on, one upload."""
+        if getattr(self, 'data', None) is None:
+            return
+        key = self.props.filelist[self.props.actualFrame]
+        self.canvas.set_compare_frame('pinned', self.data, self.metadata, key=key)
+        # switches the partner to the pinned frame, see compare_changed
+        self.props.partnerComboBox.setCurrentIndex(0)
+        self.canvas.show_compare(self.props.compare_mode() is not None)
+
+    def update_compare(self, key):
+        # hidden while the partner has no frame, e.g. no side by side
+        # product at this time
+        self.canvas.set_compare_frame('a', self.data, self.metadata, key=key)
+        self.canvas.show_compare(True)
+
+    def mouse_clicked(self, event):
+        col, row = [int(np.floor(v)) for v in self.canvas._click_position]
+        nrows, ncols = self.canvas.shape
+        if not (0 <= row < nrows and 0 <= col < ncols) or not self.props.frames:
+            return
+        if self.props.cube is not None:
+            # the chunked cube is column friendly already
+            times, values = self.props.cube.timeseries(row, col)
+            self.show_series((row, col, values))
+            return
+        future = self._series_pool.submit(self._read_series,
+                                          list(self.props.filelist), row, col)
+        future.add_done_callback(
+            lambda f: self.signal_series_ready.emit(f))
+
+    def _read_series(self, filelist, row, col):
+        if self.stack is None or not self.stack.extends(filelist):
+            self.stack = PixelStack(filelist).open(
+                progress=self.signal_series_progress.emit)
+        return row, col, self.stack.series(row, col, filelist)
+
+    def show_series(self, result):
+        if not isinstance(result, tuple):
+            try:
+                result = result.result()
+            except Exception as err:
+                print("Reading the time series failed:", err)
+                return
+        self.props.show_series(*result)
 
     def speed(self):
-        self.timer.setInterval(self.props.speed.value())
+        self.scheduler.set_interval(self.props.speed.value())
+
+    def fps_measured(self, event):
+        self.props.renderFps.setText("{0:.1f}".format(self.canvas.fps))
+        self.props.show_store_stats(self.store.stats())
 
     # slide through data
     def slider_changed(self):
-        data, meta = utils.read_radolan(self.props.filelist[self.props.actualFrame], loaddata=False)
-        print("Slider-Meta:", meta['datetime'])
-        scantime = meta['datetime']
+        # prefetch in the direction the slider is moving,
+        # wrapping at the ends like reload does
+        frame = self.props.actualFrame
+        delta = frame - self._lastFrame
+        if delta:
+            if abs(delta) > self.props.frames // 2:
+                delta = -delta
+            self._direction = 1 if delta > 0 else -1
+        self._lastFrame = frame
+        if not self.props.frames:
+            return
+        if self.scheduler.isActive() and not self._advancing:
+            self.scheduler.seek(frame)
+        self.props.seriesPlot.set_marker(frame)
+        scantime = self.props.frame_time(frame)
         self.props.sliderLabel.setText(scantime.strftime("%H:%M"))
         self.props.date.setText(scantime.strftime("%Y-%m-%d"))
         self.update_canvas()
@@ -105,31 +475,135 @@ class MainWindow(QtGui.QMainWindow):
 
     def update_canvas(self):
 
-        if self.canvas.image.visible:
+        # frames which are not decoded yet are shown from frame_ready
+        frame = self.loader.request(self.props.actualFrame, self._direction)
+        if frame is not None:
+            self.show_frame(*frame)
 
-            self.data, self.metadata = utils.read_radolan(self.props.filelist[self.props.actualFrame])
-            print(self.data.min(), self.data.max())
-            def scale(val, src, dst):
-                """
-                Scale the given value from the scale of src to the scale of dst.
-                """
-                return ((val - src[0]) / (src[1]-src[0])) * (dst[1]-dst[0]) + dst[0]
+    def frame_ready(self, index):
+        if index != self.props.actualFrame:
+            return
+        # queued signals may arrive after the frame was dropped again
+        frame = self.loader.get(index)
+        if frame is not None:
+            self.show_frame(*frame)
 
-            #self.canvas.image.set_data(scale(self.data, (0,65), (0,255)))
-            self.canvas.image.set_data(self.data)
+    def frame_failed(self, index, message):
+        self.show_message("Reading frame {0} failed: {1}".format(index + 1, message))
 
-        self.canvas.update()
+    def show_message(self, message):
+        """Show a message for the user in the status bar."""
+        print(message)
+        self.statusBar().showMessage(message, 10000)
+
+    def show_frame(self, data, metadata):
+        with timings.stage('show_frame'):
+            self.data, self.metadata = data, metadata
+            key = self.props.filelist[self.props.actualFrame]
+
+            if self.sliding is not None:
+                self.update_sliding()
+            self.update_contours()
+
+            if self.canvas.image.visible:
+                # integer counts, scaled to physical units in the shader
+                self.canvas.set_frame(self.data, self.metadata, key=key)
+                self.canvas.set_linked_frames(self.metadata.get('linked', ()))
+                if self.props.compare_mode() is not None:
+                    self.update_compare(key)
+                if self.canvas._mouse_position is not None:
+                    # the value under a resting mouse follows the frames
+                    self.props.show_mouse_value(self.canvas.cursor_value())
+
+            self.canvas.update()
+        if startup.elapsed('first_frame') is None:
+            startup.mark('first_frame')
+            self.signal_first_frame.emit()
+
+    def canvas_message(self, event):
+        self.show_message(event.text)
 
     def mouse_moved(self, event):
-        self.props.show_mouse(self.canvas._mouse_position)
+        self.props.show_mouse(self.canvas._mouse_position,
+                              self.canvas._mouse_lonlat,
+                              self.canvas.cursor_value())
+
+    def closeEvent(self, event):
+        self.loader.shutdown()
+        self._acc_pool.shutdown(wait=False)
+        self._sliding_pool.shutdown(wait=False)
+        self.contour_worker.shutdown()
+        self._series_pool.shutdown(wait=False)
+        if self.bulk is not None:
+            self.bulk.close()
+        if self._bulk_pool is not None:
+            self._bulk_pool.shutdown(wait=False)
+        self._bulk_thread.shutdown(wait=False)
+        self._linked_pool.shutdown(wait=False)
+        super(MainWindow, self).closeEvent(event)
+
+def derived_data(result, stat):
+    """Statistic ``stat`` of an accumulation ``result(stat)`` to show."""
+    if stat == 'exceedance':
+        return result('exceed')[0]
+    return result(stat)
+
+
+def advance_sliding(sliding, todo, reader, stat):
+    """Push ``todo``, ``(counts, metadata)`` frames or items of
+    ``reader``, into SlidingAccumulator ``sliding``.
+
+    Returns ``(data, frames)``, ``data`` the statistic ``stat`` as a copy
+    of its own, as the accumulator changes with the next step.
+    """
+    with timings.stage('accumulate'):
+        for item in todo:
+            sliding.push(*(item if isinstance(item, tuple) else reader(item)))
+        data = np.array(derived_data(sliding.result, stat), dtype=np.float32)
+    return data, len(sliding)
+
 
 def start(arg):
+    """Run the viewer on ``arg.argv``.
 
-    print(arg.argv)
-    appQt = QtGui.QApplication(arg.argv)
-    win = MainWindow()
+    ``--profile-startup`` prints the time to the first frame and the heavy
+    modules loaded by then, and exits nonzero above the budget in seconds
+    of ``--startup-budget=SECONDS`` or ``RVIEW_STARTUP_BUDGET`` (default 3).
+    """
+    startup.mark('imports')
+    argv = list(arg.argv)
+    print(argv)
+    profile_startup = '--profile-startup' in argv
+    budget = float(os.environ.get('RVIEW_STARTUP_BUDGET', 3.))
+    for a in argv:
+        if a.startswith('--startup-budget='):
+            budget = float(a.split('=', 1)[1])
+    argv = [a for a in argv if a != '--profile-startup' and
+            not a.startswith('--startup-budget=')]
+    appQt = QtGui.QApplication(argv)
+    # optional start directory, e.g. written by rview.synthetic
+    dirname = None
+    if len(argv) > 1 and os.path.isdir(argv[1]):
+        dirname = argv[1]
+    win = MainWindow(dirname)
     win.show()
-    appQt.exec_()
+    startup.mark('window')
+    if profile_startup:
+        def report():
+            print(startup.format_report())
+            elapsed = startup.elapsed()
+            if elapsed > budget:
+                print("startup took {0:.2f} s, over the budget of {1:.2f} s"
+                      .format(elapsed, budget))
+            appQt.exit(1 if elapsed > budget else 0)
+        win.signal_first_frame.connect(report)
+        # an empty directory has no first frame
+        win.props.signal_index_ready.connect(
+            lambda f: win.props.frames or report())
+    status = appQt.exec_()
+    if profile_startup:
+        sys.exit(status)
+    return status
 
 if __name__ == '__main__':
     print('pentecost: Calling module <app> as main...')
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Persistent header index of RADOLAN directories
+
+The parsed headers of all files in a directory are kept in a JSON
+sidecar, in the directory itself or, if that is not writable, in the
+user cache. Opening the directory again only parses new or changed files.
+"""
+
+import os
+import glob
+import json
+import bisect
+import hashlib
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+from rview import radolan
+from rview.grid import default_cachedir
+
+INDEX_NAME = '.rview-index.json'
+INDEX_VERSION = 1
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def read_entry(path):
+    """Parse the header of ``path`` into an index entry.
+
+    Returns None for files which cannot be parsed (yet), e.g. empty or
+    truncated ones still being written. They are not indexed, so the
+    next update parses them again.
+    """
+    try:
+        st = os.stat(path)
+        _, _, attrs = radolan.read_radolan(path, loaddata=False)
+    except (IOError, OSError, EOFError, ValueError, KeyError):
+        return None
+    return dict(name=os.path.basename(path),
+                mtime=st.st_mtime,
+                size=st.st_size,
+                datetime=attrs['datetime'].strftime(TIME_FORMAT),
+                producttype=attrs['producttype'],
+                nrow=attrs['nrow'],
+                ncol=attrs['ncol'],
+                precision=attrs.get('precision', 1.),
+                payloadoffset=attrs.get('payloadoffset'),
+                datasize=attrs.get('datasize'))
+
+
+class HeaderIndex(object):
+    """
+    Header index of the RADOLAN files matching ``pattern`` in ``dirname``.
+
+    ``entries`` are sorted by datetime and product type, each entry is a
+    dict with name, mtime, size, datetime, producttype, nrow, ncol,
+    precision, payloadoffset and datasize.
+    """
+    def __init__(self, dirname, pattern='raa01*', workers=8):
+        self.dirname = os.path.abspath(dirname)
+        self.pattern = pattern
+        self.workers = workers
+        self.entries = []
+        self._times = []
+        self.load()
+        self.update()
+
+    @property
+    def filename(self):
+        if os.access(self.dirname, os.W_OK):
+            return os.path.join(self.dirname, INDEX_NAME)
+        digest = hashlib.md5(self.dirname.encode('utf-8')).hexdigest()
+        return os.path.join(default_cachedir(), 'index-' + digest + '.json')
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        try:
+            with open(self.filename) as fh:
+                index = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return
+        if index.get('version') == INDEX_VERSION and \
+                index.get('pattern') == self.pattern:
+            self._set_entries(index['entries'])
+
+    def save(self):
+        fname = self.filename
+        try:
+            if not os.path.isdir(os.path.dirname(fname)):
+                os.makedirs(os.path.dirname(fname))
+            tmp = fname + '.tmp'
+            with open(tmp, 'w') as fh:
+                json.dump(dict(version=INDEX_VERSION, pattern=self.pattern,
+                               entries=self.entries), fh)
+            os.rename(tmp, fname)
+        except (IOError, OSError):
+            pass
+
+    def update(self):
+        """Parse new and changed files, drop removed ones.
+
+        Returns the number of (re)parsed files.
+        """
+        known = dict((e['name'], e) for e in self.entries)
+        entries = []
+        stale = []
+        for path in glob.glob(os.path.join(self.dirname, self.pattern)):
+            entry = known.get(os.path.basename(path))
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if entry is not None and entry['mtime'] == st.st_mtime and \
+                    entry['size'] == st.st_size:
+                entries.append(entry)
+            else:
+                stale.append(path)
+        if stale:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                entries.extend(e for e in pool.map(read_entry, stale)
+                               if e is not None)
+        if stale or len(entries) != len(self.entries):
+            self._set_entries(entries)
+            self.save()
+        return len(stale)
+
+    def add(self, paths):
+        """Add files known to be new, without rescanning the directory.
+
+        Returns the entries of the files which could be parsed.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            new = [e for e in pool.map(read_entry, paths) if e is not None]
+        names = set(e['name'] for e in new)
+        self._set_entries([e for e in self.entries
+                           if e['name'] not in names] + new)
+        self.save()
+        return new
+
+    def producttypes(self):
+        return sorted(set(e['producttype'] for e in self.entries))
+
+    def select(self, producttype=None):
+        """Return the entries of one product type, or all of them."""
+        if producttype is None:
+            return list(self.entries)
+        return [e for e in self.entries if e['producttype'] == producttype]
+
+    def filelist(self, producttype=None):
+        return [self.path(e) for e in self.select(producttype)]
+
+    def path(self, entry):
+        return os.path.join(self.dirname, entry['name'])
+
+    def datetime(self, entry):
+        return dt.datetime.strptime(entry['datetime'], TIME_FORMAT)
+
+    def seek(self, when, producttype=None):
+        """Return the position of the first entry at or after ``when``
+        within :meth:`select` (``producttype``), clipped to the last one.
+        """
+        if producttype is None:
+            times = self._times
+        else:
+            times = [e['datetime'] for e in self.select(producttype)]
+        pos = bisect.bisect_left(times, when.strftime(TIME_FORMAT))
+        return min(pos, max(len(times) - 1, 0))
+
+    def _set_entries(self, entries):
+        # ISO timestamps sort like the datetimes they represent
+        entries.sort(key=lambda e: (e['datetime'], e['producttype'],
+                                    e['name']))
+        self.entries = entries
+        self._times = [e['datetime'] for e in entries]
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Background frame loader
+
+Frames are decoded on a thread pool ahead of the current play/scrub
+position and handed back to the GUI thread via ``signal_frame_ready``.
+"""
+
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt4 import QtCore
+
+from rview import utils
+from rview.profiling import timings
+
+
+class FrameLoader(QtCore.QObject):
+    """
+    Prefetches the next ``depth`` frames in play/scrub direction.
+
+    ``reader`` is called with one item of ``filelist`` and has to return
+    a ``(data, metadata)`` tuple like :func:`rview.utils.read_radolan`.
+    """
+    signal_frame_ready = QtCore.pyqtSignal(int, name='frameReady')
+    signal_frame_failed = QtCore.pyqtSignal(int, str, name='frameFailed')
+
+    def __init__(self, reader=None, depth=8, workers=2, parent=None):
+        super(FrameLoader, self).__init__(parent)
+        if reader is None:
+            reader = utils.read_radolan
+        self.reader = reader
+        self.depth = depth
+        self.filelist = []
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._frames = OrderedDict()
+        self._generation = 0
+        self._decode_times = deque(maxlen=32)
+
+    def set_filelist(self, filelist):
+        """Switch to a new list of frames, dropping all queued work."""
+        with self._lock:
+            self._generation += 1
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+            self._frames.clear()
+            self.filelist = filelist
+
+    def extend(self, filelist):
+        """Switch to ``filelist``, which continues the current one.
+
+        Decoded and queued frames are kept, as their indices are unchanged.
+        """
+        with self._lock:
+            self.filelist = filelist
+
+    def window(self, index, direction=1):
+        """Return frame indices from ``index`` up to ``depth`` frames ahead.
+
+        The window wraps around like the playback loop in ``MainWindow``.
+        """
+        nframes = len(self.filelist)
+        if not nframes:
+            return []
+        step = 1 if direction >= 0 else -1
+        count = min(self.depth + 1, nframes)
+        return [(index + step * i) % nframes for i in range(count)]
+
+    def get(self, index):
+        """Return the decoded frame at ``index`` or None if not ready."""
+        with self._lock:
+            frame = self._frames.get(index)
+            if frame is not None:
+                self._frames.move_to_end(index)
+            return frame
+
+    def ready(self, index):
+        return index in self._frames
+
+    def decode_rate(self):
+        """Frames per second one worker decoded recently, 0 if unknown."""
+        times = list(self._decode_times)
+        if not times:
+            return 0.
+        return len(times) / max(sum(times), 1e-6)
+
+    def request(self, index, direction=1):
+        """Schedule ``index`` and the frames ahead of it.
+
+        Pending frames outside the new window are cancelled, so jumping
+        around on the slider does not leave stale work in the queue.
+        Returns the frame if it is ready already, None otherwise.
+        """
+        wanted = self.window(index, direction)
+        with self._lock:
+            for idx in list(self._pending):
+                if idx not in wanted and self._pending[idx].cancel():
+                    del self._pending[idx]
+            for idx in wanted:
+                if idx in self._frames or idx in self._pending:
+                    continue
+                future = self._pool.submit(self._read, idx,
+                                           self.filelist[idx],
+                                           self._generation)
+                self._pending[idx] = future
+            frame = self._frames.get(index)
+            if frame is not None:
+                self._frames.move_to_end(index)
+        return frame
+
+    def prefetch(self, indices):
+        """Schedule ``indices`` without cancelling any queued work."""
+        with self._lock:
+            for idx in indices:
+                if idx in self._frames or idx in self._pending:
+                    continue
+                self._pending[idx] = self._pool.submit(
+                    self._read, idx, self.filelist[idx], self._generation)
+
+    def load(self, index):
+        """Return the frame at ``index``, decoding it here if necessary."""
+        frame = self.get(index)
+        if frame is not None:
+            return frame
+        with self._lock:
+            future = self._pending.get(index)
+            generation = self._generation
+        if future is not None and not future.cancelled():
+            future.result()
+            frame = self.get(index)
+            if frame is not None:
+                return frame
+        frame = self.reader(self.filelist[index])
+        self._store(index, frame, generation)
+        return frame
+
+    def shutdown(self):
+        self.set_filelist([])
+        self._pool.shutdown(wait=False)
+
+    def _read(self, index, item, generation):
+        t0 = time.time()
+        try:
+            with timings.stage('load'):
+                frame = self.reader(item)
+        except Exception as err:
+            # forget the failed frame, so it can be requested again
+            with self._lock:
+                current = generation == self._generation
+                if current:
+                    self._pending.pop(index, None)
+            if current:
+                self.signal_frame_failed.emit(index, "{0}: {1}".format(
+                    item, err))
+            raise
+        self._decode_times.append(time.time() - t0)
+        if self._store(index, frame, generation):
+            self.signal_frame_ready.emit(index)
+
+    def _store(self, index, frame, generation):
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._pending.pop(index, None)
+            self._frames[index] = frame
+            self._frames.move_to_end(index)
+            # keep the current window plus the same amount of history
+            while len(self._frames) > 2 * (self.depth + 1):
+                self._frames.popitem(last=False)
+        return True
+
+
+class LinkedReader(object):
+    """
+    Reader decoding the frames of linked products with every frame.
+
+    ``linked`` maps an item to the items of the other products at the
+    same time, None where a product has no frame. These are read on
+    ``pool`` while ``reader`` decodes the item itself, so a step costs
+    the slowest decode instead of their sum. They are handed on as
+    ``metadata['linked']``, a list of ``(data, metadata)`` or None.
+    """
+    def __init__(self, reader, linked, pool):
+        self.reader = reader
+        self.linked = linked
+        self.pool = pool
+
+    def __call__(self, item):
+        futures = [None if other is None else self.pool.submit(self.reader, other)
+                   for other in self.linked.get(item, ())]
+        data, metadata = self.reader(item)
+        metadata = dict(metadata)
+        metadata['linked'] = [self._result(future) for future in futures]
+        return data, metadata
+
+    @staticmethod
+    def _result(future):
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            # a broken file of another product must not hide this frame
+            return None
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Wall-clock playback scheduler
+
+Advances playback by elapsed time instead of by timer ticks. Frames
+which are not decoded when they are due are skipped, playback never
+waits for the loader.
+"""
+
+import time
+from collections import deque
+
+from PyQt4 import QtCore
+
+
+class PlaybackScheduler(QtCore.QObject):
+    """
+    Emits ``signal_advance`` with the frame to show next.
+
+    ``is_ready(index)`` tells whether a frame can be shown without
+    waiting, ``decode_rate()`` returns the measured frames per second of
+    one decoding worker (see FrameLoader). When no frame up to the due one
+    is ready, ``signal_request`` asks for decoding to restart there.
+    """
+    signal_advance = QtCore.pyqtSignal(int, name='advance')
+    signal_request = QtCore.pyqtSignal(int, name='request')
+    signal_stats = QtCore.pyqtSignal(float, float, int, name='stats')
+    signal_decode_rate = QtCore.pyqtSignal(float, name='decodeRate')
+
+    # fps used for an interval of 0, roughly the monitor refresh
+    max_fps = 60.
+
+    def __init__(self, is_ready, decode_rate=None, parent=None):
+        super(PlaybackScheduler, self).__init__(parent)
+        self.is_ready = is_ready
+        self.decode_rate = decode_rate
+        self.frames = 0
+        self.fps = self.max_fps
+        self.dropped = 0
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.tick)
+        self.timer.setInterval(int(1000. / self.fps))
+
+        self.stats_timer = QtCore.QTimer(self)
+        self.stats_timer.setInterval(1000)
+        self.stats_timer.timeout.connect(self.report)
+
+        self._shown = deque(maxlen=256)
+        self._t0 = 0.
+        self._start = 0
+        self._position = 0
+        self._requested = None
+
+    def isActive(self):
+        return self.timer.isActive()
+
+    def set_interval(self, msec):
+        """Target one frame every ``msec`` milliseconds."""
+        self.fps = 1000. / msec if msec > 0 else self.max_fps
+        self.fps = min(self.fps, self.max_fps)
+        self.timer.setInterval(int(1000. / self.fps))
+        if self.isActive():
+            self._rebase(self._position)
+
+    def start(self, position, frames):
+        """Start playing at frame ``position`` of ``frames``."""
+        self.frames = frames
+        self.dropped = 0
+        self._shown.clear()
+        self._rebase(position)
+        self.timer.start()
+        self.stats_timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.stats_timer.stop()
+        self.report()
+
+    def tick(self):
+        if not self.frames:
+            return
+        # frames are counted unwrapped, shown modulo the number of frames
+        due = self._start + int((time.time() - self._t0) * self.fps)
+        if due <= self._position:
+            return
+        # never look back more than one loop
+        for pos in range(due, max(self._position, due - self.frames), -1):
+            if self.is_ready(pos % self.frames):
+                self.dropped += pos - self._position - 1
+                self._position = pos
+                self._shown.append(time.time())
+                self.signal_advance.emit(pos % self.frames)
+                if pos < due:
+                    # behind schedule, pick up the time from here on
+                    self._rebase(pos)
+                return
+        # nothing decoded in time, keep the clock running and let the
+        # loader start at the due frame
+        if due != self._requested:
+            self._requested = due
+            self.signal_request.emit(due % self.frames)
+
+    def seek(self, position):
+        """Continue from ``position``, e.g. after the slider was moved."""
+        self._rebase(position)
+
+    def achieved_fps(self):
+        now = time.time()
+        recent = [t for t in self._shown if now - t < 2.]
+        if len(recent) < 2:
+            return 0.
+        return (len(recent) - 1) / max(recent[-1] - recent[0], 1e-6)
+
+    def report(self):
+        self.signal_stats.emit(self.fps, self.achieved_fps(), self.dropped)
+        if self.decode_rate is not None:
+            rate = self.decode_rate()
+            if rate > 0:
+                self.signal_decode_rate.emit(rate)
+
+    def _rebase(self, position):
+        self._position = position
+        self._start = position
+        self._t0 = time.time()
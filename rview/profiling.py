@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Per-stage timing instrumentation
+
+``timings.stage(name)`` wraps a pipeline stage (read, decode, upload,
+draw, ...). While disabled it costs one attribute check. Enabled, it keeps
+a rolling window of durations per stage for p50/p95 statistics and the
+spans for a Chrome trace (chrome://tracing, Perfetto).
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+from collections import defaultdict, deque
+
+import numpy as np
+
+
+class _Stage(object):
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class _NoStage(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_nostage = _NoStage()
+
+
+class StageTimer(object):
+    """
+    Collects durations of named pipeline stages from all threads.
+
+    ``window`` durations per stage are kept for statistics, at most
+    ``max_events`` spans for the trace export.
+    """
+    def __init__(self, window=200, max_events=100000):
+        self.enabled = False
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _nostage
+        return _Stage(self, name)
+
+    def record(self, name, start, stop):
+        with self._lock:
+            self._samples[name].append(stop - start)
+            self._events.append((name, start, stop, threading.current_thread().ident))
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._events.clear()
+
+    def summary(self):
+        """Return ``{stage: (p50, p95, count)}`` in seconds."""
+        with self._lock:
+            samples = dict((k, list(v)) for k, v in self._samples.items())
+        return dict((k, (float(np.percentile(v, 50)),
+                         float(np.percentile(v, 95)), len(v)))
+                    for k, v in samples.items() if v)
+
+    def format_summary(self):
+        lines = ['{0:12s} {1:>8s} {2:>8s}'.format('stage', 'p50 ms', 'p95 ms')]
+        for name, (p50, p95, count) in sorted(self.summary().items()):
+            lines.append('{0:12s} {1:8.2f} {2:8.2f}'.format(name, p50 * 1e3,
+                                                            p95 * 1e3))
+        return '\n'.join(lines)
+
+    def export_chrome_trace(self, fname):
+        """Write the recorded spans in Chrome trace event format."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+        trace = [dict(name=name, cat='rview', ph='X', pid=pid, tid=tid,
+                      ts=(start - self._origin) * 1e6,
+                      dur=(stop - start) * 1e6)
+                 for name, start, stop, tid in events]
+        with open(fname, 'w') as fh:
+            json.dump(dict(traceEvents=trace, displayTimeUnit='ms'), fh)
+        return len(trace)
+
+
+# process-wide timer, shared by loader, decoder, canvas and main window
+timings = StageTimer()
+
+
+class Profile(object):
+    """cProfile switch, e.g. around a playback run."""
+    def __init__(self):
+        self._profile = None
+
+    @property
+    def active(self):
+        return self._profile is not None
+
+    def start(self):
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self, fname):
+        """Stop profiling and dump the stats to ``fname``."""
+        self._profile.disable()
+        self._profile.dump_stats(fname)
+        self._profile = None
+        return fname
+
+
+_startup_origin = time.perf_counter()
+
+
+class StartupTimer(object):
+    """
+    Startup milestones, measured from the import of this module.
+
+    Every :meth:`mark` also notes which of the heavy modules were
+    imported by then, so a new eager import shows up in the report.
+    """
+    heavy = ('PyQt4', 'vispy', 'wradlib', 'osgeo', 'netCDF4', 'matplotlib')
+
+    def __init__(self, origin=None):
+        self.origin = _startup_origin if origin is None else origin
+        self.marks = []
+
+    def mark(self, name):
+        """Record milestone ``name`` once, returns its elapsed seconds."""
+        for mark, elapsed, _ in self.marks:
+            if mark == name:
+                return elapsed
+        elapsed = time.perf_counter() - self.origin
+        loaded = [mod for mod in self.heavy if mod in sys.modules]
+        self.marks.append((name, elapsed, loaded))
+        return elapsed
+
+    def elapsed(self, name=None):
+        """Seconds to milestone ``name``, the latest one by default."""
+        for mark, elapsed, _ in reversed(self.marks):
+            if name is None or mark == name:
+                return elapsed
+        return None
+
+    def format_report(self):
+        lines = ['startup:']
+        for name, elapsed, loaded in self.marks:
+            lines.append('  {0:<12s} {1:8.1f} ms  {2}'.format(
+                name, elapsed * 1e3, ', '.join(loaded)))
+        return '\n'.join(lines)
+
+
+startup = StartupTimer()
@@ -9,8 +9,11 @@
 """
 
 import os
-import glob
-import netCDF4 as nc
+import bisect
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 from vispy.color.colormap import get_colormaps
 from vispy import color
@@ -21,12 +24,15 @@ from PyQt4.QtGui import QApplication,\
                         QFontMetrics,\
                         QPainter
 
-import wradlib as wrl
-
 # other pentecost_qt imports
 from rview import utils
+from rview.cube import RadolanCube
+from rview.index import HeaderIndex
+from rview.follow import DirectoryFollower
+from rview.profiling import startup
 
 def get_radolan_variable(filename):
+    import wradlib as wrl
     return wrl.io.read_RADOLAN_composite(filename)
 
 class LongLabel(QLabel):
@@ -38,6 +44,53 @@ class LongLabel(QLabel):
 
         painter.drawText(self.rect(), self.alignment(), elided)
 
+class SeriesPlot(QtGui.QWidget):
+    """Minimal line plot of a pixel time series with a marker at the
+    actual frame. NaN values leave gaps."""
+    def __init__(self, parent=None):
+        super(SeriesPlot, self).__init__(parent)
+        self.setMinimumHeight(120)
+        self.values = None
+        self.title = ''
+        self.marker = None
+
+    def set_series(self, values, title=''):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.title = title
+        self.update()
+
+    def set_marker(self, index):
+        self.marker = index
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = self.rect().adjusted(4, 16, -4, -4)
+        painter.fillRect(self.rect(), QtCore.Qt.white)
+        painter.drawText(4, 12, self.title)
+        if self.values is None or not len(self.values):
+            return
+        values = self.values
+        finite = values[np.isfinite(values)]
+        top = finite.max() if finite.size else 1.
+        bottom = min(finite.min(), 0.) if finite.size else 0.
+        scale = (top - bottom) or 1.
+        n = max(len(values) - 1, 1)
+        x = rect.left() + rect.width() * np.arange(len(values)) / float(n)
+        y = rect.bottom() - rect.height() * (values - bottom) / scale
+        painter.drawText(rect.adjusted(0, 0, -2, 0),
+                         QtCore.Qt.AlignRight | QtCore.Qt.AlignTop,
+                         "{0:.2f}".format(top))
+        painter.setPen(QtGui.QPen(QtCore.Qt.blue))
+        for i in range(len(values) - 1):
+            if np.isfinite(y[i]) and np.isfinite(y[i + 1]):
+                painter.drawLine(QtCore.QPointF(x[i], y[i]),
+                                 QtCore.QPointF(x[i + 1], y[i + 1]))
+        if self.marker is not None and self.marker < len(values):
+            painter.setPen(QtGui.QPen(QtCore.Qt.red))
+            painter.drawLine(QtCore.QPointF(x[self.marker], rect.top()),
+                             QtCore.QPointF(x[self.marker], rect.bottom()))
+
 # Properties
 class PropertiesWidget(QtGui.QWidget):
     """
@@ -49,8 +102,24 @@ class PropertiesWidget(QtGui.QWidget):
     signal_playpause_changed = QtCore.pyqtSignal(name='startstop')
     signal_toggle_Cursor = QtCore.pyqtSignal(name='toggleCursor')
     signal_data_changed = QtCore.pyqtSignal(name='data_changed')
-
-    def __init__(self, parent=None):
+    signal_dir_changed = QtCore.pyqtSignal(name='dir_changed')
+    signal_frames_appended = QtCore.pyqtSignal(name='frames_appended')
+    signal_timing_changed = QtCore.pyqtSignal(name='timing_changed')
+    signal_export_trace = QtCore.pyqtSignal(str, name='export_trace')
+    signal_accumulate = QtCore.pyqtSignal(name='accumulate')
+    signal_derived_changed = QtCore.pyqtSignal(name='derived_changed')
+    signal_contours_changed = QtCore.pyqtSignal(name='contours_changed')
+    signal_bulk_load = QtCore.pyqtSignal(name='bulk_load')
+    signal_index_ready = QtCore.pyqtSignal(object, name='index_ready')
+    signal_linked_changed = QtCore.pyqtSignal(name='linked_changed')
+    signal_compare_changed = QtCore.pyqtSignal(name='compare_changed')
+    signal_pin_partner = QtCore.pyqtSignal(name='pin_partner')
+    signal_source_closing = QtCore.pyqtSignal(name='source_closing')
+
+    # accumulation windows in hours, None is the whole loaded range
+    acc_windows = [("1 h", 1), ("3 h", 3), ("24 h", 24), ("Event", None)]
+
+    def __init__(self, dirname=None, parent=None):
         super(PropertiesWidget, self).__init__(parent)
 
         l_cmap = QtGui.QLabel("Colormap")
@@ -65,25 +134,66 @@ class PropertiesWidget(QtGui.QWidget):
         self.curCheckBox.stateChanged.connect(self.toggleCursor)
         self.curSelectLabel = QtGui.QLabel("Cursor Activation", self)
 
+        self.followCheckBox = QtGui.QCheckBox()
+        self.followCheckBox.stateChanged.connect(self.toggleFollow)
+        self.followLabel = QtGui.QLabel("Follow Directory", self)
+        self.autoCheckBox = QtGui.QCheckBox()
+        self.autoLabel = QtGui.QLabel("Jump to Newest", self)
+
+        self.timingCheckBox = QtGui.QCheckBox()
+        self.timingCheckBox.stateChanged.connect(self.toggleTiming)
+        self.timingLabel = QtGui.QLabel("Stage Timings", self)
+        self.profileCheckBox = QtGui.QCheckBox()
+        self.profileLabel = QtGui.QLabel("Profile Playback", self)
+        self.traceButton = QtGui.QPushButton("Export Trace")
+        self.traceButton.clicked.connect(self.exportTrace)
+        self.follower = None
+
+        self.contourLabel = QtGui.QLabel("Contour Levels", self)
+        self.contourEdit = QtGui.QLineEdit()
+        self.contourEdit.setToolTip("Comma separated levels in physical units")
+        self.contourEdit.editingFinished.connect(self.contoursChanged)
+
         # HLine
         self.hline0 = QtGui.QFrame()
         self.hline0.setFrameShape(QtGui.QFrame.HLine)
         self.hline0.setFrameShadow(QtGui.QFrame.Sunken)
 
         # Start Directory
-        self.dirname = "/automount/radar/dwd/rx/2014/2014-06/2014-06-08/"
+        if dirname is None:
+            dirname = os.environ.get('RVIEW_DATA', "/automount/radar/dwd/rx/2014/2014-06/2014-06-08/")
+        self.dirname = dirname
         self.dirLabel = LongLabel(self.dirname)
-        self.filelist = sorted(glob.glob(os.path.join(self.dirname, "raa01*")))
-        self.frames = len(self.filelist)
+        # frames are read with reader(filelist[i]), see FrameLoader
+        self.reader = utils.read_radolan_counts
+        self.cube = None
+        # the directory is scanned on a thread, see open_dir
+        self.index = None
+        self._scan_dir = None
+        self._scan_pool = ThreadPoolExecutor(max_workers=1)
+        self.signal_index_ready.connect(self.set_index)
+        self.filelist = []
+        self.times = []
+        self.frames = 0
         self.actualFrame = 0
-
-        attrs, meta = wrl.io.read_RADOLAN_composite(self.filelist[0])
         self.data0ranges =[(0,100)]
 
         self.data0ComboBox = QtGui.QComboBox()
-        self.data0ComboBox.addItem(meta['producttype'])
-        self.data0ComboBox.setCurrentIndex(0)
         self.data0ComboBox.currentIndexChanged.connect(self.update_data)
+        # further products shown side by side at the same time
+        self.linkedLabel = QtGui.QLabel("Side by Side", self)
+        self.linkedList = QtGui.QListWidget()
+        self.linkedList.setMaximumHeight(60)
+        self.linkedList.setToolTip("Products shown next to the selected one")
+        self.linkedList.itemChanged.connect(self.linkedChanged)
+
+        # decode all frames at once, see rview.bulk
+        self.bulkButton = QtGui.QPushButton("Decode All")
+        self.bulkButton.setToolTip("Decode all frames on a process pool")
+        self.bulkButton.clicked.connect(self.bulkLoad)
+        self.bulkProgress = QtGui.QProgressBar()
+        self.bulkProgress.setTextVisible(True)
+        self.bulkProgress.setVisible(False)
 
         # Sliders
         self.slider = QtGui.QSlider(QtCore.Qt.Horizontal)
@@ -111,12 +221,16 @@ class PropertiesWidget(QtGui.QWidget):
         self.gbox1 = QtGui.QGridLayout()
         self.srcbox = QtGui.QGridLayout()
         mbox = QtGui.QGridLayout()
+        accbox = QtGui.QGridLayout()
+        cmpbox = QtGui.QGridLayout()
         gbox2 = QtGui.QGridLayout()
 
         vbox = QtGui.QVBoxLayout()
         vbox.addLayout(self.gbox1)
         vbox.addLayout(self.srcbox)
         vbox.addLayout(mbox)
+        vbox.addLayout(accbox)
+        vbox.addLayout(cmpbox)
         vbox.addLayout(gbox2)
         vbox.addStretch(0)
 
@@ -125,13 +239,29 @@ class PropertiesWidget(QtGui.QWidget):
         self.gbox1.addWidget(self.combo, 0, 2)
         self.gbox1.addWidget(self.curCheckBox,3,1)
         self.gbox1.addWidget(self.curSelectLabel,3,0)
-        self.gbox1.addWidget(self.hline0,7,0,1,3)
+        self.gbox1.addWidget(self.followCheckBox,4,1)
+        self.gbox1.addWidget(self.followLabel,4,0)
+        self.gbox1.addWidget(self.autoCheckBox,5,1)
+        self.gbox1.addWidget(self.autoLabel,5,0)
+        self.gbox1.addWidget(self.timingCheckBox,6,1)
+        self.gbox1.addWidget(self.timingLabel,6,0)
+        self.gbox1.addWidget(self.traceButton,6,2)
+        self.gbox1.addWidget(self.contourLabel,7,0)
+        self.gbox1.addWidget(self.contourEdit,7,1,1,2)
+        self.gbox1.addWidget(self.profileCheckBox,8,1)
+        self.gbox1.addWidget(self.profileLabel,8,0)
+        self.gbox1.addWidget(self.hline0,9,0,1,3)
 
         # Data Source Control
         self.srcbox.addWidget(self.dirLabel, 0, 1)
         self.dirLabel.setFixedSize(220,14)
         self.srcbox.addWidget(self.dirButton, 0, 0)
+        self.srcbox.addWidget(self.cubeButton, 0, 2)
         self.srcbox.addWidget(self.data0ComboBox, 1, 1)
+        self.srcbox.addWidget(self.bulkButton, 1, 2)
+        self.srcbox.addWidget(self.bulkProgress, 2, 0, 1, 3)
+        self.srcbox.addWidget(self.linkedLabel, 3, 0)
+        self.srcbox.addWidget(self.linkedList, 3, 1, 1, 2)
 
         # Media Control
         mbox.addWidget(self.dateLabel,0,0)
@@ -144,18 +274,102 @@ class PropertiesWidget(QtGui.QWidget):
         mbox.addWidget(self.slider,2,3,1,4)
         mbox.addWidget(self.speed,3,0,1,7)
 
+        # Playback Statistics
+        self.fpsLabel = QtGui.QLabel("FPS (target/achieved)", self)
+        self.fps = QtGui.QLabel("-", self)
+        self.droppedLabel = QtGui.QLabel("Dropped Frames", self)
+        self.dropped = QtGui.QLabel("0", self)
+        self.renderFpsLabel = QtGui.QLabel("Render FPS", self)
+        self.renderFps = QtGui.QLabel("-", self)
+        mbox.addWidget(self.fpsLabel,4,0,1,3)
+        mbox.addWidget(self.fps,4,4)
+        mbox.addWidget(self.droppedLabel,5,0,1,3)
+        mbox.addWidget(self.dropped,5,4)
+        mbox.addWidget(self.renderFpsLabel,6,0,1,3)
+        mbox.addWidget(self.renderFps,6,4)
+        self.storeLabel = QtGui.QLabel("Frame Store", self)
+        self.store = QtGui.QLabel("-", self)
+        mbox.addWidget(self.storeLabel,7,0,1,3)
+        mbox.addWidget(self.store,7,4,1,3)
+
+        # Accumulation
+        self.hline2 = QtGui.QFrame()
+        self.hline2.setFrameShape(QtGui.QFrame.HLine)
+        self.hline2.setFrameShadow(QtGui.QFrame.Sunken)
+        self.accLabel = QtGui.QLabel("Accumulation", self)
+        self.accWindowComboBox = QtGui.QComboBox()
+        self.accWindowComboBox.addItems([w[0] for w in self.acc_windows])
+        self.accStatComboBox = QtGui.QComboBox()
+        self.accStatComboBox.addItems(["Sum", "Max", "Mean", "Exceedance"])
+        self.accThresholdLabel = QtGui.QLabel("Threshold (mm)", self)
+        self.accThreshold = QtGui.QDoubleSpinBox()
+        self.accThreshold.setDecimals(2)
+        self.accThreshold.setRange(0., 1000.)
+        self.accThreshold.setValue(0.1)
+        self.accButton = QtGui.QPushButton("Accumulate")
+        self.accButton.clicked.connect(self.accumulate)
+        self.derivedCheckBox = QtGui.QCheckBox()
+        self.derivedCheckBox.stateChanged.connect(self.derivedChanged)
+        self.derivedLabel = QtGui.QLabel("Show Derived Layer", self)
+        self.slidingCheckBox = QtGui.QCheckBox()
+        self.slidingCheckBox.stateChanged.connect(self.derivedChanged)
+        self.slidingLabel = QtGui.QLabel("Sliding Window", self)
+        accbox.addWidget(self.hline2,0,0,1,3)
+        accbox.addWidget(self.accLabel,1,0)
+        accbox.addWidget(self.accWindowComboBox,1,1)
+        accbox.addWidget(self.accStatComboBox,1,2)
+        accbox.addWidget(self.accThresholdLabel,2,0)
+        accbox.addWidget(self.accThreshold,2,1)
+        accbox.addWidget(self.accButton,2,2)
+        accbox.addWidget(self.derivedLabel,3,0)
+        accbox.addWidget(self.derivedCheckBox,3,1)
+        accbox.addWidget(self.slidingLabel,4,0)
+        accbox.addWidget(self.slidingCheckBox,4,1)
+
+        # Comparison, computed in the shader, see RadolanCanvas.set_compare_frame
+        self.hline3 = QtGui.QFrame()
+        self.hline3.setFrameShape(QtGui.QFrame.HLine)
+        self.hline3.setFrameShadow(QtGui.QFrame.Sunken)
+        self.compareLabel = QtGui.QLabel("Compare", self)
+        self.compareComboBox = QtGui.QComboBox()
+        self.compareComboBox.addItems(["Off", "Difference", "Ratio", "Change"])
+        self.compareComboBox.currentIndexChanged.connect(self.compareChanged)
+        self.partnerComboBox = QtGui.QComboBox()
+        self.partnerComboBox.addItems(["Pinned Frame", "Side by Side"])
+        self.partnerComboBox.setToolTip("Compare to the pinned frame or the "
+                                        "first side by side product")
+        self.partnerComboBox.currentIndexChanged.connect(self.compareChanged)
+        self.changeThresholdLabel = QtGui.QLabel("Change Threshold", self)
+        self.changeThreshold = QtGui.QDoubleSpinBox()
+        self.changeThreshold.setDecimals(2)
+        self.changeThreshold.setRange(0., 1000.)
+        self.changeThreshold.setValue(1.)
+        self.changeThreshold.valueChanged.connect(self.compareChanged)
+        self.pinButton = QtGui.QPushButton("Pin Partner")
+        self.pinButton.setToolTip("Compare to the actual frame")
+        self.pinButton.clicked.connect(self.pinPartner)
+        self.partnerLabel = QtGui.QLabel("", self)
+        cmpbox.addWidget(self.hline3,0,0,1,3)
+        cmpbox.addWidget(self.compareLabel,1,0)
+        cmpbox.addWidget(self.compareComboBox,1,1)
+        cmpbox.addWidget(self.partnerComboBox,1,2)
+        cmpbox.addWidget(self.changeThresholdLabel,2,0)
+        cmpbox.addWidget(self.changeThreshold,2,1)
+        cmpbox.addWidget(self.pinButton,2,2)
+        cmpbox.addWidget(self.partnerLabel,3,0,1,3)
+
         # Mouse Properties
         # HLine
         self.hline = QtGui.QFrame()
         self.hline.setFrameShape(QtGui.QFrame.HLine)
         self.hline.setFrameShadow(QtGui.QFrame.Sunken)
-        radolan = wrl.georef.get_radolan_grid()
-        self.r0 = radolan[0,0]
         self.mousePointLabel = QtGui.QLabel("Mouse Position", self)
         self.mousePointXYLabel = QtGui.QLabel("XY", self)
         self.mousePointLLLabel = QtGui.QLabel("LL", self)
         self.mousePointXY = QtGui.QLabel("", self)
         self.mousePointLL = QtGui.QLabel("", self)
+        self.mouseValueLabel = QtGui.QLabel("Value", self)
+        self.mouseValue = QtGui.QLabel("", self)
 
         gbox2.addWidget(self.hline,0,0,1,3)
         gbox2.addWidget(self.mousePointLabel,1,0)
@@ -163,19 +377,236 @@ class PropertiesWidget(QtGui.QWidget):
         gbox2.addWidget(self.mousePointXY,1,2)
         gbox2.addWidget(self.mousePointLLLabel,2,1)
         gbox2.addWidget(self.mousePointLL,2,2)
+        gbox2.addWidget(self.mouseValueLabel,3,1)
+        gbox2.addWidget(self.mouseValue,3,2)
+
+        # Pixel Time Series, filled by clicking into the canvas
+        self.seriesLabel = QtGui.QLabel("Click a pixel for its time series", self)
+        self.seriesPlot = SeriesPlot(self)
+        gbox2.addWidget(self.seriesLabel,4,0,1,3)
+        gbox2.addWidget(self.seriesPlot,5,0,1,3)
 
         self.hline1 = QtGui.QFrame()
         self.hline1.setFrameShape(QtGui.QFrame.HLine)
         self.hline1.setFrameShadow(QtGui.QFrame.Sunken)
 
         self.setLayout(vbox)
+        self.open_dir(self.dirname)
 
     def update_data(self):
+        if self.index is not None:
+            self.apply_index()
+            self.update_source()
         self.signal_data_changed.emit()
 
+    def producttype(self):
+        product = str(self.data0ComboBox.currentText())
+        return product or None
+
+    def apply_index(self):
+        """Take the frames of the selected product from the header index."""
+        entries = self.index.select(self.producttype())
+        self.filelist = [self.index.path(e) for e in entries]
+        self.times = [self.index.datetime(e) for e in entries]
+        self.frames = len(self.filelist)
+        self.actualFrame = 0
+
+    def update_source(self):
+        self.slider.blockSignals(True)
+        self.slider.setMaximum(self.frames)
+        self.slider.setValue(1)
+        self.slider.blockSignals(False)
+        self.signal_dir_changed.emit()
+
+    def set_products(self, products):
+        self.data0ComboBox.blockSignals(True)
+        self.data0ComboBox.clear()
+        self.data0ComboBox.addItems(products)
+        self.data0ComboBox.setCurrentIndex(0)
+        self.data0ComboBox.blockSignals(False)
+        # products shown side by side stay checked, e.g. when follow mode
+        # adds a product
+        checked = set()
+        for row in range(self.linkedList.count()):
+            item = self.linkedList.item(row)
+            if item.checkState() == QtCore.Qt.Checked:
+                checked.add(str(item.text()))
+        self.linkedList.blockSignals(True)
+        self.linkedList.clear()
+        for product in products:
+            item = QtGui.QListWidgetItem(product, self.linkedList)
+            item.setFlags(item.flags() | QtCore.Qt.ItemIsUserCheckable)
+            if product in checked:
+                item.setCheckState(QtCore.Qt.Checked)
+            else:
+                item.setCheckState(QtCore.Qt.Unchecked)
+        self.linkedList.blockSignals(False)
+
+    def linked_products(self):
+        """Checked products besides the selected one."""
+        if self.index is None:
+            return []
+        products = []
+        for row in range(self.linkedList.count()):
+            item = self.linkedList.item(row)
+            product = str(item.text())
+            if item.checkState() == QtCore.Qt.Checked and product != self.producttype():
+                products.append(product)
+        return products
+
+    def linked_files(self):
+        """Map each file of the frame list to the files of the linked
+        products with the same time, None where there is none."""
+        products = self.linked_products()
+        if not products:
+            return {}
+        bytime = []
+        for product in products:
+            entries = self.index.select(product)
+            bytime.append(dict((self.index.datetime(e), self.index.path(e))
+                               for e in entries))
+        return dict((fname, [files.get(when) for files in bytime])
+                    for fname, when in zip(self.filelist, self.times))
+
+    def linkedChanged(self, item):
+        self.signal_linked_changed.emit()
+
+    def frame_time(self, frame):
+        return self.times[frame]
+
+    def seek(self, when):
+        """Move the slider to the first frame at or after ``when``."""
+        if self.index is not None:
+            pos = self.index.seek(when, self.producttype())
+        else:
+            pos = min(bisect.bisect_left(self.times, when), self.frames - 1)
+        self.slider.setValue(pos + 1)
+
+    def accumulation_stat(self):
+        return str(self.accStatComboBox.currentText()).lower()
+
+    def accumulation_range(self, frame=None):
+        """Return ``(start, stop)`` of the frames in the accumulation
+        window ending at ``frame`` (default the actual one)."""
+        if frame is None:
+            frame = self.actualFrame
+        hours = self.acc_windows[self.accWindowComboBox.currentIndex()][1]
+        if hours is None:
+            return 0, self.frames
+        begin = self.times[frame] - dt.timedelta(hours=hours)
+        return bisect.bisect_right(self.times, begin, 0, frame), frame + 1
+
+    def accumulation_window(self):
+        """Number of frames of the accumulation window."""
+        hours = self.acc_windows[self.accWindowComboBox.currentIndex()][1]
+        if hours is None or self.frames < 2:
+            return max(self.frames, 1)
+        interval = (self.times[1] - self.times[0]).total_seconds()
+        return max(int(round(hours * 3600. / interval)), 1)
+
+    def accumulate(self):
+        self.signal_accumulate.emit()
+
+    def derivedChanged(self):
+        self.signal_derived_changed.emit()
+
+    def compare_mode(self):
+        """'difference', 'ratio', 'change' or None."""
+        mode = str(self.compareComboBox.currentText()).lower()
+        return None if mode == 'off' else mode
+
+    def partner_linked(self):
+        """Whether the first side by side product is the partner."""
+        return self.partnerComboBox.currentIndex() == 1
+
+    def compareChanged(self):
+        self.signal_compare_changed.emit()
+
+    def pinPartner(self):
+        if self.frames:
+            when = self.frame_time(self.actualFrame)
+            self.partnerLabel.setText("Partner {0} {1}".format(
+                self.producttype() or '', when.strftime("%Y-%m-%d %H:%M")))
+        self.signal_pin_partner.emit()
+
+    def contour_levels(self):
+        """Sorted contour levels, invalid entries are skipped."""
+        levels = []
+        for item in str(self.contourEdit.text()).split(','):
+            try:
+                levels.append(float(item))
+            except ValueError:
+                pass
+        return sorted(set(levels))
+
+    def bulkLoad(self):
+        self.signal_bulk_load.emit()
+
+    def show_bulk_progress(self, done, total):
+        self.bulkProgress.setMaximum(total)
+        self.bulkProgress.setValue(done)
+        self.bulkProgress.setFormat("Decoded %v/%m")
+        self.bulkProgress.setVisible(done < total)
+
+    def contoursChanged(self):
+        self.signal_contours_changed.emit()
+
     def toggleCursor(self):
         self.signal_toggle_Cursor.emit()
 
+    def toggleTiming(self):
+        self.signal_timing_changed.emit()
+
+    def exportTrace(self):
+        f = QtGui.QFileDialog.getSaveFileName(self, "Export Chrome Trace", "rview-trace.json", "JSON (*.json)")
+        if f:
+            self.signal_export_trace.emit(str(f))
+
+    def toggleFollow(self):
+        if self.follower is not None:
+            self.follower.stop()
+            self.follower = None
+        if self.followCheckBox.isChecked() and self.index is not None:
+            self.follower = DirectoryFollower(self.index, parent=self)
+            self.follower.signal_new_entries.connect(self.append_entries)
+
+    def append_entries(self, entries):
+        """Add frames of newly arrived files without rescanning."""
+        product = self.producttype()
+        products = self.index.producttypes()
+        if self.data0ComboBox.count() != len(products):
+            self.set_products(products)
+            if product not in products:
+                # e.g. the first files of an empty directory
+                self.apply_index()
+                self.update_source()
+                return
+            # the frame list still holds the selected product
+            self.data0ComboBox.blockSignals(True)
+            self.data0ComboBox.setCurrentIndex(products.index(product))
+            self.data0ComboBox.blockSignals(False)
+        entries = [e for e in entries if e['producttype'] == product]
+        if not entries:
+            return
+        times = [self.index.datetime(e) for e in entries]
+        if self.times and min(times) < self.times[-1]:
+            # late arrival in between known frames, take the new order
+            current = self.times[self.actualFrame]
+            self.apply_index()
+            self.update_source()
+            self.seek(current)
+            return
+        # new list objects, so FrameLoader notices the change
+        self.filelist = self.filelist + [self.index.path(e) for e in entries]
+        self.times = self.times + times
+        self.frames = len(self.filelist)
+        self.slider.blockSignals(True)
+        self.slider.setMaximum(self.frames)
+        self.slider.blockSignals(False)
+        self.signal_frames_appended.emit()
+        if self.autoCheckBox.isChecked():
+            self.slider.setValue(self.frames)
+
     def update_slider(self, position):
         self.actualFrame = position - 1
         self.signal_slider_changed.emit()
@@ -195,6 +626,12 @@ class PropertiesWidget(QtGui.QWidget):
         self.dirButton.setToolTip("Load Directory")
         self.dirButton.clicked.connect(self.selectDir)
 
+        self.cubeButton = QtGui.QToolButton()
+        self.cubeButton.setIcon(self.style().standardIcon(QtGui.QStyle.SP_DriveHDIcon))
+        self.cubeButton.setIconSize(iconSize)
+        self.cubeButton.setToolTip("Load netCDF4 Cube")
+        self.cubeButton.clicked.connect(self.selectCube)
+
         self.playPauseButton = QtGui.QToolButton()
         self.playPauseButton.setIcon(self.style().standardIcon(QtGui.QStyle.SP_MediaPlay))
         self.playPauseButton.setIconSize(iconSize)
@@ -213,18 +650,64 @@ class PropertiesWidget(QtGui.QWidget):
         self.rewButton.setToolTip("SeekBackward")
         self.rewButton.clicked.connect(self.seekbackward)
 
+    def open_dir(self, dirname):
+        """Scan ``dirname`` on a thread, :meth:`set_index` takes over."""
+        self._scan_dir = dirname
+        future = self._scan_pool.submit(HeaderIndex, dirname)
+        future.dirname = dirname
+        future.add_done_callback(lambda f: self.signal_index_ready.emit(f))
+
+    def set_index(self, future):
+        if future.dirname != self._scan_dir:
+            # another directory or a cube was opened meanwhile
+            return
+        self._scan_dir = None
+        try:
+            self.index = future.result()
+        except Exception as err:
+            # e.g. an unreadable directory, a single bad file is skipped
+            print("Scanning {0} failed:".format(future.dirname), err)
+            return
+        startup.mark('index')
+        self.set_products(self.index.producttypes())
+        self.apply_index()
+        self.update_source()
+        self.toggleFollow()
+
     def selectDir(self):
         f = QtGui.QFileDialog.getExistingDirectory(self, "Select a Folder", "/automount/data/radar/dwd", QtGui.QFileDialog.ShowDirsOnly)
 
         if os.path.isdir(f):
             self.dirLabel.setText(f)
             self.dirname = f
-            self.filelist = glob.glob(os.path.join(self.dirname, "raa01*"))
-            data, meta = utils.read_radolan(self.filelist[0])
-            print("Meta:", meta)
-            self.data0ComboBox.clear()
-            self.data0ComboBox.addItem(meta['producttype'])
-            self.data0ComboBox.setCurrentIndex(0)
+            self.close_cube()
+            self.reader = utils.read_radolan_counts
+            self.open_dir(self.dirname)
+
+    def selectCube(self):
+        f = QtGui.QFileDialog.getOpenFileName(self, "Select a Cube", self.dirname, "netCDF4 (*.nc)")
+
+        if os.path.isfile(f):
+            self.dirLabel.setText(f)
+            self.close_cube()
+            self.cube = RadolanCube(f)
+            self.index = None
+            self._scan_dir = None
+            self.reader = self.cube.read_counts
+            self.filelist = list(range(len(self.cube)))
+            self.times = list(self.cube.times)
+            self.frames = len(self.filelist)
+            self.actualFrame = 0
+            self.set_products([self.cube.producttype])
+            self.update_source()
+            self.toggleFollow()
+
+    def close_cube(self):
+        if self.cube is not None:
+            # readers stop queuing reads of the cube first
+            self.signal_source_closing.emit()
+            self.cube.close()
+            self.cube = None
 
     def seekforward(self):
         if self.slider.value() == self.slider.maximum():
@@ -253,7 +736,38 @@ class PropertiesWidget(QtGui.QWidget):
             self.playPauseButton.setIcon(self.style().standardIcon(QtGui.QStyle.SP_MediaPlay))
         self.signal_playpause_changed.emit()
 
-    def show_mouse(self, point):
+    def show_playback_stats(self, target, achieved, dropped):
+        self.fps.setText("{0:.1f} / {1:.1f}".format(target, achieved))
+        self.dropped.setText("{0:d}".format(dropped))
+
+    def show_series(self, row, col, values):
+        finite = values[np.isfinite(values)]
+        total = finite.sum() if finite.size else 0.
+        self.seriesLabel.setText("Pixel ({0:d}, {1:d}): {2:d} frames, sum {3:.2f}".format(
+            col, row, len(values), total))
+        self.seriesPlot.set_series(values, "{0} ({1:d}, {2:d})".format(
+            self.producttype() or '', col, row))
+        self.seriesPlot.set_marker(self.actualFrame)
+
+    def show_series_progress(self, done, total):
+        self.seriesLabel.setText("Stacking frames {0:d}/{1:d}".format(done, total))
+
+    def show_store_stats(self, stats):
+        self.store.setText("{0:d} frames, {1:.1f} MB (x{2:.1f})".format(
+            stats['frames'], stats['nbytes'] / 2.**20, stats['ratio']))
+
+    def show_mouse(self, point, ll=None, value=None):
+        """Show the mouse position, ``ll`` is its (lon, lat) and
+        ``value`` the physical value of the frame there."""
         self.mousePointXY.setText("({0:d}, {1:d})".format(int(point[0]), int(point[1])))
-        ll = utils.radolan_to_wgs84(point + self.r0)
-        self.mousePointLL.setText("({0:.1f}, {1:.1f})".format(ll[0], ll[1]))
+        if ll is not None:
+            self.mousePointLL.setText("({0:.1f}, {1:.1f})".format(ll[0], ll[1]))
+        self.show_mouse_value(value)
+
+    def show_mouse_value(self, value):
+        if value is None:
+            self.mouseValue.setText("")
+        elif np.isnan(value):
+            self.mouseValue.setText("nodata")
+        else:
+            self.mouseValue.setText("{0:g}".format(value))
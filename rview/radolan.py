@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+RADOLAN composite decoder
+
+Decodes the binary payload of DWD composites into a value array and a
+per-pixel flag bitfield. The flag bits are the upper nibble of the 16 bit
+products, 8 bit products (RX, EX, WX) get the same bits from their
+special values 249 (clutter) and 250 (nodata).
+
+Uncompressed files are memory-mapped and decoded from a view on the
+mapping, compressed ones are read through wradlib's file handle.
+wradlib is imported on first use.
+"""
+
+import mmap
+
+import numpy as np
+
+from rview.profiling import timings
+
+FLAG_SECONDARY = 0x1
+FLAG_NODATA = 0x2
+FLAG_NEGATIVE = 0x4
+FLAG_CLUTTER = 0x8
+
+BYTE_PRODUCTS = ('RX', 'EX', 'WX')
+RUNLENGTH_PRODUCTS = ('PG', 'PC')
+
+# flags of the 8 bit products, indexed by raw byte value
+_byte_flags = np.zeros(256, dtype=np.uint8)
+_byte_flags[249] = FLAG_CLUTTER
+_byte_flags[250] = FLAG_NODATA
+
+# storage type and reserved nodata count of the raw counts per product
+# family, e.g. the fill value of rview.cube
+_byte_storage = (np.uint8, 250)
+_word_storage = (np.uint16, 0xFFFF)
+_signed_storage = (np.int16, -0x8000)
+
+
+def storage(producttype):
+    if producttype in BYTE_PRODUCTS + RUNLENGTH_PRODUCTS:
+        return _byte_storage
+    if producttype == 'RD':
+        return _signed_storage
+    return _word_storage
+
+
+def decode_radolan(buf, attrs):
+    """Decode the binary section of a RADOLAN composite.
+
+    Parameters
+    ----------
+    buf : bytes-like
+        binary payload behind the header
+    attrs : dict
+        parsed header as returned from
+        :func:`wradlib.io.parse_DWD_quant_composite_header`
+
+    Returns
+    -------
+    output : tuple of two items (values, flags)
+        - values : raw counts of shape (nrow, ncol), uint8 for RX/EX/WX,
+          uint16 with the flag bits cleared, int16 with signs applied for RD
+        - flags : uint8 array of the same shape holding ``FLAG_*`` bits
+    """
+    shape = (attrs['nrow'], attrs['ncol'])
+    size = shape[0] * shape[1]
+    product = attrs['producttype']
+
+    if product in BYTE_PRODUCTS:
+        # values are a view on the buffer, flags come from a lookup table
+        values = np.frombuffer(buf, np.uint8, count=size)
+        flags = _byte_flags.take(values)
+    elif product in RUNLENGTH_PRODUCTS:
+        import wradlib as wrl
+        attrs.setdefault('nodataflag', 255)
+        values = wrl.io.decode_radolan_runlength_array(bytes(buf), attrs)
+        flags = np.where(values == attrs['nodataflag'],
+                         FLAG_NODATA, 0).astype(np.uint8)
+        return values, flags.reshape(shape)
+    else:
+        raw = np.frombuffer(buf, '<u2', count=size)
+        # bits 13-16 map onto FLAG_SECONDARY ... FLAG_CLUTTER
+        flags = (raw >> 12).astype(np.uint8)
+        values = raw & 0xFFF
+        if product == 'RD':
+            # 12 bit counts fit into int16 without changing the bits
+            values = values.view(np.int16)
+            np.negative(values, out=values,
+                        where=(flags & FLAG_NEGATIVE).astype(bool))
+
+    return values.reshape(shape), flags.reshape(shape)
+
+
+def to_physical(values, flags, attrs, missing=0):
+    """Apply the precision factor and set nodata pixels to ``missing``.
+
+    Gives the same values as :func:`wradlib.io.read_RADOLAN_composite`.
+    """
+    if attrs['producttype'] in BYTE_PRODUCTS + RUNLENGTH_PRODUCTS:
+        data = values.astype(np.float64)
+    else:
+        data = values * attrs['precision']
+    data[(flags & FLAG_NODATA).astype(bool)] = missing
+    return data
+
+
+def map_radolan(fname):
+    """Memory-map an uncompressed RADOLAN file.
+
+    Returns
+    -------
+    output : tuple of two items (header, payload)
+        - header : ASCII header without the ``\\x03`` terminator
+        - payload : read-only memoryview on the mapped bytes behind it,
+          or None if the file is gzip or bzip2 compressed
+    """
+    with open(fname, 'rb') as fh:
+        mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:2] == b'\x1f\x8b' or mapped[:3] == b'BZh':
+        mapped.close()
+        return None, None
+    end = mapped.find(b'\x03')
+    if end < 0:
+        mapped.close()
+        raise EOFError("Unexpected EOF detected while reading RADOLAN header.")
+    header = mapped[:end].decode()
+    # the memoryview keeps the mapping alive as long as arrays use it
+    return header, memoryview(mapped)[end + 1:]
+
+
+def read_radolan(fname, loaddata=True):
+    """Read a RADOLAN composite into raw values and flags.
+
+    Uncompressed files are decoded straight from a memory map, so 8 bit
+    values are a view on the page cache without any copy.
+
+    Returns
+    -------
+    output : tuple of three items (values, flags, attrs)
+        values and flags are None if ``loaddata`` is False
+    """
+    # wradlib is loaded on the first read
+    import wradlib as wrl
+    with timings.stage('read'):
+        header, payload = map_radolan(fname)
+        if header is not None:
+            attrs = wrl.io.parse_DWD_quant_composite_header(header)
+            attrs['payloadoffset'] = len(header) + 1
+            if not loaddata:
+                payload.release()
+                return None, None, attrs
+            buf = payload[:attrs['datasize']]
+        else:
+            f = wrl.io.get_radolan_filehandle(fname)
+            try:
+                header = wrl.io.read_radolan_header(f)
+                attrs = wrl.io.parse_DWD_quant_composite_header(header)
+                if not loaddata:
+                    return None, None, attrs
+                buf = wrl.io.read_radolan_binary_array(f, attrs['datasize'])
+            finally:
+                f.close()
+    with timings.stage('decode'):
+        values, flags = decode_radolan(buf, attrs)
+    return values, flags, attrs
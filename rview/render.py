@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Headless batch rendering
+
+Renders a range of RADOLAN frames through RadolanCanvas (colormap,
+contour filter, city markers) into PNG files without a display, using
+vispy's EGL or OSMesa backend. The range is split into contiguous chunks
+rendered by a process pool, each worker with its own GL context. The PNG
+sequence can then be encoded into a video with ffmpeg.
+
+Usage: python -m rview.render <directory> <outdir> [--video out.mp4]
+"""
+
+import os
+import argparse
+import subprocess
+import multiprocessing
+
+OFFSCREEN_BACKENDS = ('egl', 'osmesa')
+FRAME_PATTERN = 'frame_{0:05d}.png'
+
+
+def create_app(backend=None):
+    """Return a vispy Application on an offscreen backend."""
+    from vispy import app
+
+    backends = (backend,) if backend else OFFSCREEN_BACKENDS
+    for name in backends:
+        try:
+            return app.use_app(name)
+        except Exception:
+            continue
+    raise RuntimeError("No offscreen vispy backend available, "
+                       "tried {0}".format(', '.join(backends)))
+
+
+def render_frames(filelist, outdir, start=0, size=(1400, 1300),
+                  cmap='grays', clim=(0, 100), backend=None):
+    """Render ``filelist`` into ``outdir``, numbering from ``start``.
+
+    Returns the names of the written PNG files.
+    """
+    from vispy.io import write_png
+    from rview import utils
+    from rview.glcanvas import RadolanCanvas
+
+    canvas = RadolanCanvas(ring_size=1, size=size, show=False,
+                           app=create_app(backend))
+    canvas.set_colormap(cmap)
+    canvas.set_clim(clim)
+    written = []
+    try:
+        for i, fname in enumerate(filelist):
+            counts, metadata = utils.read_radolan_counts(fname, cache=False)
+            canvas.set_frame(counts, metadata)
+            out = os.path.join(outdir, FRAME_PATTERN.format(start + i))
+            write_png(out, canvas.render())
+            written.append(out)
+    finally:
+        canvas.close()
+    return written
+
+
+def _render_chunk(args):
+    filelist, outdir, start, options = args
+    return render_frames(filelist, outdir, start=start, **options)
+
+
+def render_range(filelist, outdir, processes=None, **options):
+    """Render ``filelist`` in parallel, one contiguous chunk per process.
+
+    ``options`` are passed on to :func:`render_frames`.
+    """
+    if not filelist:
+        return []
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+    processes = processes or multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(filelist)))
+    step = -(-len(filelist) // processes)
+    chunks = [(filelist[i:i + step], outdir, i, options)
+              for i in range(0, len(filelist), step)]
+    if processes == 1:
+        written = [_render_chunk(c) for c in chunks]
+    else:
+        # spawned workers do not inherit any GL state of the parent
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(processes) as pool:
+            written = pool.map(_render_chunk, chunks)
+    return [f for chunk in written for f in chunk]
+
+
+def encode_video(outdir, outfile, fps=10, ffmpeg='ffmpeg'):
+    """Encode the PNG sequence in ``outdir`` with ffmpeg."""
+    subprocess.check_call([ffmpeg, '-y', '-loglevel', 'error',
+                           '-framerate', str(fps),
+                           '-i', os.path.join(outdir, 'frame_%05d.png'),
+                           '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+                           '-pix_fmt', 'yuv420p', outfile])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Render RADOLAN frames to PNG (and video) headless")
+    parser.add_argument('dirname')
+    parser.add_argument('outdir')
+    parser.add_argument('--product', default=None,
+                        help="product type, e.g. RX, default: the first "
+                             "one found")
+    parser.add_argument('--start', type=int, default=0)
+    parser.add_argument('--stop', type=int, default=None)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--size', default='1400,1300')
+    parser.add_argument('--cmap', default='grays')
+    parser.add_argument('--clim', default='0,100')
+    parser.add_argument('--backend', default=None,
+                        help="vispy backend, default: egl, then osmesa")
+    parser.add_argument('--video', default=None,
+                        help="encode the frames into this file with ffmpeg")
+    parser.add_argument('--fps', type=int, default=10)
+    args = parser.parse_args()
+
+    from rview.index import HeaderIndex
+    index = HeaderIndex(args.dirname)
+    product = args.product
+    if product is None:
+        # like cube.ingest, frames of several products do not make a video
+        products = index.producttypes()
+        product = products[0] if products else None
+    filelist = index.filelist(product)
+    filelist = filelist[args.start:args.stop]
+    written = render_range(filelist, args.outdir, processes=args.processes,
+                           size=tuple(int(v) for v in args.size.split(',')),
+                           cmap=args.cmap,
+                           clim=tuple(float(v) for v in args.clim.split(',')),
+                           backend=args.backend)
+    print("Rendered {0} frames into {1}".format(len(written), args.outdir))
+    if args.video:
+        encode_video(args.outdir, args.video, fps=args.fps)
+        print("Encoded {0}".format(args.video))
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Pixel-major frame stack
+
+The raw counts of a list of RADOLAN files, stacked as a memory-mapped
+``(nrow, ncol, time)`` array in the cache directory. The time series of
+one pixel is a single contiguous read, instead of one file per frame.
+"""
+
+import os
+import glob
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from rview import radolan
+from rview.cache import file_key
+from rview.grid import default_cachedir
+
+
+class PixelStack(object):
+    """
+    Stack of the frames in ``filelist``, all of one product and shape.
+
+    The stack file is named after path, mtime and size of every file, so
+    a changed file list builds a new one, which replaces the stack of the
+    same directory and product. Nodata pixels hold the fill value of
+    :func:`rview.radolan.storage`.
+    """
+    def __init__(self, filelist, cachedir=''):
+        self.filelist = list(filelist)
+        if cachedir == '':
+            cachedir = default_cachedir()
+        self.cachedir = cachedir
+        _, _, attrs = radolan.read_radolan(self.filelist[0], loaddata=False)
+        self.producttype = attrs['producttype']
+        self.shape = (attrs['nrow'], attrs['ncol'], len(self.filelist))
+        self.dtype, self.fill = radolan.storage(self.producttype)
+        if self.producttype in radolan.BYTE_PRODUCTS + \
+                radolan.RUNLENGTH_PRODUCTS:
+            self.precision = 1.
+        else:
+            self.precision = attrs.get('precision', 1.)
+        self.data = None
+
+    @property
+    def prefix(self):
+        """Common start of the stack file names of this directory and
+        product."""
+        dirname = os.path.dirname(os.path.abspath(self.filelist[0]))
+        digest = hashlib.md5(dirname.encode('utf-8'))
+        return os.path.join(self.cachedir, 'stack_{0}_{1}_'.format(
+            digest.hexdigest(), self.producttype))
+
+    @property
+    def filename(self):
+        digest = hashlib.md5()
+        for fname in self.filelist:
+            digest.update(repr(file_key(fname)).encode('utf-8'))
+        return '{0}{1}.npy'.format(self.prefix, digest.hexdigest())
+
+    def open(self, progress=None, block=32, workers=4):
+        """Map the stack, building it first if there is none.
+
+        ``progress(done, total)`` is called after every block of frames.
+        """
+        fname = self.filename
+        if not os.path.exists(fname):
+            if not os.path.isdir(self.cachedir):
+                os.makedirs(self.cachedir)
+            # build into a temporary file, so concurrent viewers never map
+            # a half written stack
+            fd, tmp = tempfile.mkstemp(suffix='.npy', dir=self.cachedir)
+            os.close(fd)
+            try:
+                self._build(tmp, progress, block, workers)
+                os.rename(tmp, fname)
+            except BaseException:
+                os.remove(tmp)
+                raise
+            self._remove_superseded(fname)
+        self.data = np.load(fname, mmap_mode='r')
+        return self
+
+    def _remove_superseded(self, fname):
+        # older stacks of the directory and product, e.g. before follow
+        # mode appended files
+        for old in glob.glob(glob.escape(self.prefix) + '*.npy'):
+            if old != fname:
+                try:
+                    os.remove(old)
+                except OSError:
+                    # still mapped by another viewer (Windows)
+                    pass
+
+    def _build(self, fname, progress, block, workers):
+        nrow, ncol, ntime = self.shape
+        out = np.lib.format.open_memmap(fname, mode='w+', dtype=self.dtype,
+                                        shape=self.shape)
+        buf = np.empty((block, nrow, ncol), dtype=self.dtype)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, ntime, block):
+                stop = min(start + block, ntime)
+                frames = pool.map(radolan.read_radolan,
+                                  self.filelist[start:stop])
+                for slot, (values, flags, _) in enumerate(frames):
+                    np.copyto(buf[slot], values, casting='unsafe')
+                    buf[slot][(flags & radolan.FLAG_NODATA).astype(bool)] = \
+                        self.fill
+                # one strided write per block of frames
+                out[:, :, start:stop] = \
+                    buf[:stop - start].transpose(1, 2, 0)
+                if progress is not None:
+                    progress(stop, ntime)
+        out.flush()
+        del out
+
+    def series(self, row, col, filelist=None):
+        """Physical values of pixel ``(row, col)``, NaN where nodata.
+
+        Frames of ``filelist`` following the stacked ones, e.g. new files
+        in follow mode, are read from their files.
+        """
+        raw = np.array(self.data[row, col, :])
+        values = raw.astype(np.float64) * self.precision
+        values[raw == self.fill] = np.nan
+        if filelist is None or len(filelist) <= len(self.filelist):
+            return values
+        extra = []
+        for fname in filelist[len(self.filelist):]:
+            pvalues, flags, attrs = radolan.read_radolan(fname)
+            extra.append(radolan.to_physical(pvalues[row:row + 1, col:col + 1],
+                                             flags[row:row + 1, col:col + 1],
+                                             attrs, missing=np.nan)[0, 0])
+        return np.concatenate([values, extra])
+
+    def extends(self, filelist):
+        """Whether ``filelist`` starts with the stacked files."""
+        return list(filelist[:len(self.filelist)]) == self.filelist
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Compressed in-memory frame store
+
+Keeps every decoded frame in RAM as zlib or lzma compressed counts. Rain
+fields are mostly zeros, so a day of RX fits in a few MB instead of
+233 MB, and scrubbing over loaded days never goes back to the files.
+"""
+
+import zlib
+import lzma
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from rview.cache import file_key
+
+_codecs = {
+    'zlib': (lambda buf, level: zlib.compress(buf, level), zlib.decompress),
+    'lzma': (lambda buf, level: lzma.compress(buf, preset=level),
+             lzma.decompress),
+}
+
+
+class FrameStore(object):
+    """
+    Compressed ``(counts, metadata)`` frames, LRU evicted above
+    ``maxbytes`` of compressed data.
+
+    ``method`` is 'zlib' or 'lzma', ``level`` its compression level.
+    zlib decompresses a 900 x 900 frame in a few milliseconds, lzma
+    compresses tighter at about three times the cost.
+    """
+    def __init__(self, maxbytes=1 * 2**30, method='zlib', level=6):
+        self.compress, self.decompress = _codecs[method]
+        self.method = method
+        self.level = level
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.rawbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def put(self, key, counts, metadata):
+        counts = np.ascontiguousarray(counts)
+        payload = self.compress(counts.data, self.level)
+        entry = (payload, counts.dtype, counts.shape, dict(metadata))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._forget(old)
+            self._entries[key] = entry
+            self.nbytes += len(payload)
+            self.rawbytes += counts.nbytes
+            while self.nbytes > self.maxbytes and len(self._entries) > 1:
+                self._forget(self._entries.popitem(last=False)[1])
+
+    def get(self, key, out=None):
+        """Return ``(counts, metadata)`` or None.
+
+        Without ``out`` counts is a read-only array on the decompressed
+        bytes. A reusable ``out`` array of matching shape and dtype
+        receives the counts instead, e.g. for consumers which only copy
+        the frame on (upload to the GPU).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        payload, dtype, shape, metadata = entry
+        counts = np.frombuffer(self.decompress(payload), dtype).reshape(shape)
+        if out is not None:
+            out[...] = counts
+            counts = out
+        return counts, dict(metadata)
+
+    @staticmethod
+    def key(item):
+        """Store key of a reader item. Files are keyed like
+        :func:`rview.cache.file_key`, so a rewritten file is read again."""
+        if isinstance(item, str):
+            try:
+                return file_key(item)
+            except OSError:
+                pass
+        return item
+
+    def wrap(self, reader):
+        """Reader for FrameLoader which fills and uses the store.
+
+        Stored frames are handed on as read-only arrays on the
+        decompressed bytes, the texture upload reads them without a copy.
+        """
+        def read(item):
+            key = self.key(item)
+            frame = self.get(key)
+            if frame is None:
+                counts, metadata = reader(item)
+                self.put(key, counts, metadata)
+                frame = counts, metadata
+            return frame
+        return read
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.rawbytes = 0
+
+    def stats(self):
+        return dict(frames=len(self), nbytes=self.nbytes,
+                    rawbytes=self.rawbytes, maxbytes=self.maxbytes,
+                    ratio=self.rawbytes / float(max(self.nbytes, 1)))
+
+    def _forget(self, entry):
+        self.nbytes -= len(entry[0])
+        self.rawbytes -= int(np.prod(entry[2])) * entry[1].itemsize
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Synthetic RADOLAN composites
+
+Writes valid RADOLAN files (RX, EX, RW/RY/SF, PG run-length) with DWD
+style headers and moving, smoothly varying rain fields, e.g. as test and
+benchmark data.
+
+Usage: python -m rview.synthetic <outdir> [--product RX] [--count 288]
+"""
+
+import os
+import argparse
+import datetime as dt
+
+import numpy as np
+
+# grid shape (rows, cols), precision exponent and interval in minutes
+PRODUCTS = {
+    'RX': ((900, 900), 'E+00', 5),
+    'EX': ((1100, 900), 'E+00', 5),
+    'RW': ((900, 900), 'E-01', 60),
+    'RY': ((900, 900), 'E-02', 5),
+    'SF': ((900, 900), 'E-01', 1440),
+    'PG': ((460, 460), 'E+00', 5),
+}
+
+RADARS = ('asb', 'boo', 'ros', 'hnr', 'umd', 'pro', 'ess', 'fld', 'drs',
+          'neu', 'nhb', 'oft', 'eis', 'tur', 'isn', 'fbg', 'mem')
+
+# raw codes of nodata pixels
+NODATA_BYTE = 250
+NODATA_WORD = 0x29C4
+
+
+def make_header(producttype, when, datasize, shape=None):
+    """Return the ASCII header of a composite without terminator.
+
+    ``datasize`` is the size of the binary section, the ``BY`` token
+    holds the total file size like in DWD files.
+    """
+    dshape, pr, interval = PRODUCTS[producttype]
+    nrow, ncol = shape or dshape
+    radars = '<' + ','.join(RADARS) + '>'
+    tail = ('VS 3SW   2.13.1PR {0}INT{1:4d}GP{2:4d}x{3:4d}'
+            'MS{4:3d}{5}'.format(pr, interval, nrow, ncol, len(radars),
+                                  radars))
+    head = '{0}{1}10000{2}BY'.format(producttype, when.strftime('%d%H%M'),
+                                     when.strftime('%m%y'))
+    size = len(head) + 7 + len(tail) + 1 + datasize
+    return '{0}{1:7d}{2}'.format(head, size, tail)
+
+
+def rain_field(shape, when, seed=0, cells=40):
+    """Rain rate in mm/h of a field of gaussian cells moving east.
+
+    The field depends on ``seed`` and smoothly on ``when``, so series
+    of frames look like a moving rain event.
+    """
+    rng = np.random.RandomState(seed)
+    nrow, ncol = shape
+    y = np.arange(nrow, dtype=np.float32)[:, None]
+    x = np.arange(ncol, dtype=np.float32)[None, :]
+    hours = (when - dt.datetime(when.year, when.month, when.day)).seconds / 3600.
+    field = np.zeros(shape, dtype=np.float32)
+    for _ in range(cells):
+        cy, cx = rng.uniform(0, nrow), rng.uniform(0, ncol)
+        vy, vx = rng.uniform(-5, 5), rng.uniform(10, 30)
+        radius = rng.uniform(10, 60)
+        peak = rng.gamma(2., 5.)
+        cy = (cy + vy * hours) % nrow
+        cx = (cx + vx * hours) % ncol
+        gy = np.exp(-0.5 * ((y - cy) / radius) ** 2)
+        gx = np.exp(-0.5 * ((x - cx) / radius) ** 2)
+        field += peak * gy * gx
+    # cut off drizzle, most of the field is dry
+    field[field < 0.1] = 0
+    return field
+
+
+def coverage_mask(shape):
+    """Pixels outside the radar coverage, an ellipse inside the grid."""
+    nrow, ncol = shape
+    y = (np.arange(nrow)[:, None] - nrow / 2.) / (0.52 * nrow)
+    x = (np.arange(ncol)[None, :] - ncol / 2.) / (0.52 * ncol)
+    return (y ** 2 + x ** 2) > 1
+
+
+def encode_bytes(field, nodata):
+    """RX/EX: RVP6 units, 0.5 * dBZ + 32.5 from the rain rate."""
+    with np.errstate(divide='ignore'):
+        dbz = 10 * np.log10(200. * np.maximum(field, 1e-6) ** 1.6)
+    counts = np.clip(np.round((dbz + 32.5) * 2), 0, 248).astype(np.uint8)
+    counts[field <= 0] = 0
+    counts[nodata] = NODATA_BYTE
+    return counts.tobytes()
+
+
+def encode_words(field, nodata, precision, interval):
+    """RW/RY/SF: accumulation over ``interval`` minutes in 12 bit counts."""
+    amount = field * interval / 60.
+    counts = np.clip(np.round(amount / precision), 0, 0xFFF).astype('<u2')
+    counts[nodata] = NODATA_WORD
+    return counts.tobytes()
+
+
+def encode_runlength(field, nodata):
+    """PG: classes 0-5 of the rain rate, run-length coded per line.
+
+    Follows the layout decoded by wradlib: line number byte, offset byte
+    (plus 16, 255 continues), runs of ``width << 4 | value`` and a line
+    feed. The first line is the top line of the grid.
+    """
+    classes = np.digitize(field, [0.1, 1., 2., 5., 10.]).astype(np.uint8)
+    lines = []
+    for row in range(field.shape[0] - 1, -1, -1):
+        valid = np.flatnonzero(~nodata[row])
+        # the line number is not evaluated, it must not be a line feed
+        line = bytearray([16 + row % 200])
+        if not len(valid):
+            lines.append(bytes(line) + b'\n')
+            continue
+        offset = int(valid[0])
+        while offset >= 239:
+            line.append(255)
+            offset -= 239
+        line.append(offset + 16)
+        values = classes[row, valid[0]:valid[-1] + 1]
+        # split into runs of equal values, at most 15 pixels long
+        edges = np.flatnonzero(np.diff(values)) + 1
+        for run in np.split(values, edges):
+            for start in range(0, len(run), 15):
+                width = min(15, len(run) - start)
+                line.append(width << 4 | int(run[0]))
+        lines.append(bytes(line) + b'\n')
+    return b''.join(lines) + b'\x04'
+
+
+def write_radolan(fname, producttype, when, field=None, seed=0):
+    """Write one synthetic composite, returns the file name."""
+    shape, pr, interval = PRODUCTS[producttype]
+    if field is None:
+        field = rain_field(shape, when, seed=seed)
+    nodata = coverage_mask(shape)
+    if producttype in ('RX', 'EX'):
+        data = encode_bytes(field, nodata)
+    elif producttype == 'PG':
+        data = encode_runlength(field, nodata)
+    else:
+        data = encode_words(field, nodata, float('1' + pr), interval)
+    header = make_header(producttype, when, len(data), shape)
+    with open(fname, 'wb') as fh:
+        fh.write(header.encode('ascii'))
+        fh.write(b'\x03')
+        fh.write(data)
+    return fname
+
+
+def file_name(producttype, when):
+    return 'raa01-{0}_10000-{1}-dwd---bin'.format(producttype.lower(),
+                                                   when.strftime('%y%m%d%H%M'))
+
+
+def write_series(outdir, producttype='RX', start=dt.datetime(2014, 6, 8),
+                 count=288, seed=0):
+    """Write ``count`` consecutive composites into ``outdir``.
+
+    Returns the list of file names in time order.
+    """
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+    interval = dt.timedelta(minutes=PRODUCTS[producttype][2])
+    files = []
+    for i in range(count):
+        when = start + i * interval
+        fname = os.path.join(outdir, file_name(producttype, when))
+        files.append(write_radolan(fname, producttype, when, seed=seed))
+    return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Write synthetic RADOLAN composites")
+    parser.add_argument('outdir')
+    parser.add_argument('--product', default='RX',
+                        choices=sorted(PRODUCTS))
+    parser.add_argument('--count', type=int, default=288)
+    parser.add_argument('--start', default='2014-06-08T00:00',
+                        help="first timestamp, YYYY-MM-DDTHH:MM")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    files = write_series(args.outdir, args.product,
+                         dt.datetime.strptime(args.start, '%Y-%m-%dT%H:%M'),
+                         args.count, args.seed)
+    print("Wrote {0} {1} files into {2}".format(len(files), args.product,
+                                                 args.outdir))
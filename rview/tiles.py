@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (c) 2016, wradlib Development Team. All Rights Reserved.
+# Distributed under the MIT License. See LICENSE.txt for more info.
+# -----------------------------------------------------------------------------
+#!/usr/bin/env python
+
+"""
+Tiled level-of-detail image
+
+Large composites are split into a pyramid of square tiles. Level ``k``
+samples every ``2**k``-th pixel, so only the tiles of the level matching
+the camera zoom and intersecting the visible rectangle are uploaded and
+drawn. Memory and upload cost depend on the canvas size, not the grid.
+"""
+
+import numpy as np
+
+from vispy import scene, visuals
+
+from rview.counts import CountsImage
+from rview.profiling import timings
+
+
+class TiledImage(scene.Node):
+    """
+    Scene node showing integer counts as tiles of ``tile_size`` pixels.
+
+    Call :meth:`set_data` with a new frame and :meth:`update_view` when
+    the camera changed. Tile images are pooled and reused.
+    """
+    def __init__(self, cmap='grays', clim=(0, 1), tile_size=512, z=60,
+                 parent=None):
+        super(TiledImage, self).__init__(parent=parent)
+        self.tile_size = tile_size
+        self.z = z
+        self._cmap = cmap
+        self._clim = clim
+        self._filters = []
+        self._data = None
+        self._nodata = None
+        self._levels = []
+        self._generation = 0
+        self._level = 0
+        # (level, ty, tx) -> [image, generation of the uploaded data]
+        self._tiles = {}
+        self._free = []
+        self._view = None
+
+    @property
+    def shape(self):
+        return None if self._data is None else self._data.shape
+
+    @property
+    def cmap(self):
+        return self._cmap
+
+    @cmap.setter
+    def cmap(self, cmap):
+        self._cmap = cmap
+        for image in self._images():
+            image.cmap = cmap
+
+    @property
+    def clim(self):
+        return self._clim
+
+    @clim.setter
+    def clim(self, clim):
+        self._clim = clim
+        for image in self._images():
+            image.clim = clim
+
+    def attach(self, filt):
+        self._filters.append(filt)
+        for image in self._images():
+            image.attach(filt)
+
+    def set_data(self, data, nodata=None):
+        """Show a new frame, only the visible tiles are uploaded.
+        Pixels holding the ``nodata`` count are not drawn."""
+        if data.shape != self.shape:
+            self._release(list(self._tiles))
+        self._data = data
+        self._nodata = nodata
+        self._levels = [data]
+        while max(self._levels[-1].shape) > self.tile_size:
+            step = 2 ** len(self._levels)
+            # strided views, tiles are copied on upload only
+            self._levels.append(data[::step, ::step])
+        self._generation += 1
+        if self._view is not None:
+            self.update_view(*self._view)
+
+    def level_for(self, rect, viewport):
+        """Coarsest level with at least one texel per screen pixel."""
+        ratio = rect[2] / max(float(viewport[0]), 1.)
+        level = int(np.floor(np.log2(max(ratio, 1.))))
+        return min(level, len(self._levels) - 1)
+
+    def visible_tiles(self, rect, level):
+        """Keys ``(level, ty, tx)`` of the tiles intersecting ``rect``
+        ``(x, y, width, height)`` in data pixels."""
+        nrows, ncols = self._levels[level].shape
+        span = self.tile_size * 2 ** level
+        x0, y0, width, height = rect
+        tx0 = max(int(np.floor(x0 / span)), 0)
+        ty0 = max(int(np.floor(y0 / span)), 0)
+        tx1 = min(int(np.ceil((x0 + width) / span)),
+                  -(-ncols // self.tile_size))
+        ty1 = min(int(np.ceil((y0 + height) / span)),
+                  -(-nrows // self.tile_size))
+        return [(level, ty, tx) for ty in range(ty0, ty1)
+                for tx in range(tx0, tx1)]
+
+    def update_view(self, rect, viewport):
+        """Show the tiles for camera ``rect`` on a ``viewport`` of
+        (width, height) screen pixels."""
+        self._view = (rect, viewport)
+        if self._data is None:
+            return
+        level = self.level_for(rect, viewport)
+        needed = set(self.visible_tiles(rect, level))
+        self._release([key for key in self._tiles if key not in needed])
+        for key in needed:
+            entry = self._tiles.get(key)
+            if entry is None:
+                entry = self._tiles[key] = [self._acquire(key), None]
+            if entry[1] != self._generation:
+                with timings.stage('set_data'):
+                    entry[0].set_data(self._tile_data(key), self._nodata)
+                entry[1] = self._generation
+        self._level = level
+
+    def _tile_data(self, key):
+        level, ty, tx = key
+        ts = self.tile_size
+        return np.ascontiguousarray(
+            self._levels[level][ty * ts:(ty + 1) * ts, tx * ts:(tx + 1) * ts])
+
+    def _acquire(self, key):
+        level, ty, tx = key
+        if self._free:
+            image = self._free.pop()
+        else:
+            image = CountsImage(cmap=self._cmap, clim=self._clim, parent=self)
+            for filt in self._filters:
+                image.attach(filt)
+        step = 2 ** level
+        span = self.tile_size * step
+        image.transform = visuals.transforms.STTransform(
+            scale=(step, step, 1), translate=(tx * span, ty * span, self.z))
+        image.visible = True
+        return image
+
+    def _release(self, keys):
+        for key in keys:
+            image = self._tiles.pop(key)[0]
+            image.visible = False
+            self._free.append(image)
+
+    def _images(self):
+        return [entry[0] for entry in self._tiles.values()] + self._free
@@ -9,33 +9,136 @@
 """
 
 import numpy as np
-import matplotlib as mpl
-import matplotlib.colors as col
 
-import wradlib as wrl
+# wradlib, GDAL and matplotlib are imported where they are used, so
+# importing rview stays fast
+from rview import radolan
+from rview.cache import FrameCache, file_key
+from rview.profiling import timings
 
+# decoded frames shared by all readers, see read_radolan
+frame_cache = FrameCache()
 
-def wgs84_to_radolan(coords):
 
-    proj_wgs = wrl.georef.epsg_to_osr(4326)
-    proj_stereo = wrl.georef.create_osr("dwd-radolan")
-    xy = wrl.georef.reproject(coords,
-                              projection_source=proj_wgs,
-                              projection_target=proj_stereo)
-    return xy
+class RadolanTransformer(object):
+    """
+    Reusable WGS84 <-> RADOLAN polar stereographic transformation.
 
-def radolan_to_wgs84(coords):
+    The OSR objects and coordinate transformations are created once.
+    Input coordinates may have any shape ``(..., 2)``, they are
+    transformed in one call and returned with the same shape.
+    """
+    def __init__(self):
+        import wradlib as wrl
+        from osgeo import osr
+        self.proj_wgs = wrl.georef.epsg_to_osr(4326)
+        self.proj_stereo = wrl.georef.create_osr("dwd-radolan")
+        # GDAL >= 3 honours the authority axis order (lat, lon) for EPSG:4326
+        if hasattr(osr, 'OAMS_TRADITIONAL_GIS_ORDER'):
+            for proj in (self.proj_wgs, self.proj_stereo):
+                proj.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        self._to_radolan = osr.CoordinateTransformation(self.proj_wgs,
+                                                        self.proj_stereo)
+        self._to_wgs84 = osr.CoordinateTransformation(self.proj_stereo,
+                                                      self.proj_wgs)
+
+    def to_radolan(self, coords):
+        return self._transform(self._to_radolan, coords)
+
+    def to_wgs84(self, coords):
+        return self._transform(self._to_wgs84, coords)
 
-    proj_wgs = wrl.georef.epsg_to_osr(4326)
-    proj_stereo = wrl.georef.create_osr("dwd-radolan")
-    ll = wrl.georef.reproject(coords,
-                              projection_source=proj_stereo,
-                              projection_target=proj_wgs)
-    return ll
+    @staticmethod
+    def _transform(trafo, coords):
+        coords = np.asarray(coords, dtype=np.float64)
+        points = coords.reshape(-1, coords.shape[-1])[:, :2]
+        out = np.array(trafo.TransformPoints(points))[:, :2]
+        return out.reshape(coords.shape[:-1] + (2,))
 
 
-def read_radolan(f, missing=0, loaddata=True):
-    return wrl.io.read_RADOLAN_composite(f, missing=missing, loaddata=loaddata)
+_transformer = None
+
+
+def get_transformer():
+    """Return the process-wide :class:`RadolanTransformer`."""
+    global _transformer
+    if _transformer is None:
+        _transformer = RadolanTransformer()
+    return _transformer
+
+
+def wgs84_to_radolan(coords):
+    return get_transformer().to_radolan(coords)
+
+
+def radolan_to_wgs84(coords):
+    return get_transformer().to_wgs84(coords)
+
+
+def read_radolan(f, missing=0, loaddata=True, cache=True):
+    """Read RADOLAN composite ``f`` through the shared ``frame_cache``.
+
+    Header reads (``loaddata=False``) are answered from any cached entry
+    of the file. Returned arrays are read-only, as they are shared.
+    """
+    if not isinstance(f, str):
+        import wradlib as wrl
+        return wrl.io.read_RADOLAN_composite(f, missing=missing,
+                                             loaddata=loaddata)
+    if not cache:
+        return _read_radolan(f, missing, loaddata)
+    key = file_key(f) + (missing,)
+    frame = frame_cache.get(key, loaddata=loaddata)
+    if frame is None:
+        frame = _read_radolan(f, missing, loaddata)
+        frame_cache.put(key, *frame)
+    return frame
+
+
+def read_radolan_counts(f, cache=True):
+    """Read RADOLAN composite ``f`` as integer counts for the GPU.
+
+    Counts keep the native dtype of the product (uint8, uint16 or int16
+    for RD). Nodata pixels hold the reserved count ``metadata['nodata']``,
+    the fill value of :func:`rview.radolan.storage` (the nodata flag of the
+    run-length products), the shader does not draw them. Physical values
+    are ``counts * precision``.
+    """
+    if not cache:
+        return _read_radolan_counts(f)
+    key = file_key(f) + ('counts',)
+    frame = frame_cache.get(key)
+    if frame is None:
+        frame = _read_radolan_counts(f)
+        frame_cache.put(key, *frame)
+    return frame
+
+
+def _read_radolan_counts(fname):
+    values, flags, meta = radolan.read_radolan(fname)
+    product = meta['producttype']
+    if product in radolan.RUNLENGTH_PRODUCTS:
+        meta['nodata'] = meta['nodataflag']
+    else:
+        meta['nodata'] = radolan.storage(product)[1]
+    if product in radolan.BYTE_PRODUCTS + radolan.RUNLENGTH_PRODUCTS:
+        # the raw byte of nodata pixels is the reserved count already
+        meta['precision'] = 1.
+    else:
+        # 16 bit values are a fresh array, marked in place
+        with timings.stage('nodata'):
+            np.putmask(values, flags & radolan.FLAG_NODATA, meta['nodata'])
+    return values, meta
+
+
+def _read_radolan(fname, missing, loaddata):
+    values, flags, meta = radolan.read_radolan(fname, loaddata=loaddata)
+    if not loaddata:
+        return None, meta
+    meta['nodataflag'] = missing
+    with timings.stage('physical'):
+        data = radolan.to_physical(values, flags, meta, missing)
+    return data, meta
 
 
 def cmap_discretize(cmap, N):
@@ -51,6 +154,9 @@ def cmap_discretize(cmap, N):
   11     """
 
 
+     import matplotlib as mpl
+     import matplotlib.colors as col
+
      if type(cmap) == str:
          cmap = mpl.cm.get_cmap(cmap)
      colors_i = np.concatenate((np.linspace(0, 1., N), (0.,0.,0.,0.)))